@@ -1,45 +1,37 @@
 import os
-import ssl
-import requests
-from datetime import datetime
-from pytz import timezone
+import sys
 import tkinter as tk
-from tkinter import messagebox
-import pandas as pd
-import json
-import webbrowser
+from tkinter import messagebox, filedialog
 import threading
-import urllib.parse
+from functools import partial
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from core.theme import add_theme_switcher
+from core.flatten import flatten_json, flatten_keys
+from core.spill import SpillWriter
+from core.tz import common_zones, load_display_tz, save_display_tz, local_to_utc
+from core.pipeline import Cancelled, build_query, output_path, run_pipeline, time_field_sets
+from core.metrics import RunMetrics, publish
+from core.profiling import run_profiled, toggle_profiling
+from core.ui import UiQueue, ProgressPanel, JobPanel
+from core.jobs import Job
+from core.fanout import fanout_keys, load_brains, run_fanout
+from core.preview import PreviewWindow, load_preview
+from core.jsonstream import MappedExport
+from core.summary import Summary, summary_path
+from core.enrich import Enricher, enrich_keys
+
+# Parse verbose flag from command-line
+VERBOSE = any(arg in ('-verbose', '--verbose', '-v') for arg in sys.argv[1:])
+
+# Records decoded, enriched and flattened between progress/cancel checks
+FLATTEN_BATCH = 5000
 
 # Global variable to store the output filename
 stored_filename = None
 
-class SystemCertAdapter(requests.adapters.HTTPAdapter):
-    def __init__(self, *args, **kwargs):
-        self.ssl_context = ssl.create_default_context()
-        super().__init__(*args, **kwargs)
-
-    def init_poolmanager(self, *args, **kwargs):
-        kwargs["ssl_context"] = self.ssl_context
-        return super().init_poolmanager(*args, **kwargs)
-
-# Expansion settings
-special_expand_keys = ["tags"]
-special_static_values = {"tags": {"false positive", "true positive", ""}}
-expand_arrays = []
-
-flatten_keys = [
-    "id", "state", "threat", "certainty", "detection_category",
-    "detection_type", "created_timestamp", "first_timestamp",
-    "last_timestamp", "src_ip", "src_host.id", "src_host.ip",
-    "src_host.name", "src_account.id", "src_account.name",
-    "src_host.is_key_asset", "targets_key_asset", "is_triaged",
-    "custom_detection", "triage_rule_id", "filtered_by_ai",
-    "filtered_by_user", "filtered_by_rule"
-] + special_expand_keys
+# Timestamp field(s) the query window applies to
+time_fields = ["created_timestamp"]
 
 categories = [
     ("C2", "COMMAND & CONTROL", 1),
@@ -50,139 +42,290 @@ categories = [
     ("Info", "INFO", 0)
 ]
 category_vars = {}
+local_ts_var = None  # Set in main(); 1 = write timestamps in the display timezone
+tz_var = None        # Set in main(); display timezone name
+summary_var = None   # Set in main(); 1 = also write summary sheets / .summary.json
+enrich_var = None    # Set in main(); 1 = add host/account columns (core.enrich)
+ui = None           # Set in main(); worker threads reach Tk only through ui.post
+progress = None     # Set in main(); progress bar + Cancel
+jobs = None         # Set in main(); export queue panel
+brains = None       # Loaded brains file: fan-out mode queries all of them
 
-# JSON flattening
-
-def flatten_json(json_object, keys_to_include):
-    flat_data = {}
-    for key in keys_to_include:
-        parts = key.split('.')
-        value = json_object
-        try:
-            for part in parts:
-                value = value.get(part) if isinstance(value, dict) else None
-            if key in special_expand_keys and isinstance(value, list):
-                static_vals = special_static_values.get(key, set())
-                dynamic = [i for i in value if str(i).strip().lower() not in static_vals]
-                static = [i for i in value if str(i).strip().lower() in static_vals]
-                flat_data[f"sorted_{key}"] = dynamic + static
-            elif isinstance(value, list):
-                if key in expand_arrays:
-                    for i, el in enumerate(value):
-                        flat_data[f"{key}_{i+1}"] = el
-                else:
-                    flat_data[key] = ", ".join(map(str, value))
-            else:
-                flat_data[key] = value if value not in (None, "") else "N/A"
-        except Exception:
-            flat_data[key] = "N/A"
-    return flat_data
-
-# Query execution
-def run_query():
-    global stored_filename
+# Form validation shared by the query buttons (main thread)
+def read_form(fields=None):
     server = vectra_server_entry.get().strip()
     token = api_key_entry.get().strip()
     start = start_time_entry.get().strip()
     end = end_time_entry.get().strip()
 
-    if not server or not token or not start or not end:
+    if not start or not end or (not brains and (not server or not token)):
         messagebox.showerror("Input Error", "All fields are required!")
-        return
+        return None
     selected = [val for lbl, val, _ in categories if category_vars[lbl].get()]
     if not selected:
         messagebox.showerror("Input Error", "Please select at least one detection category.")
-        return
+        return None
 
-    submit_button.config(state='disabled')
-    status_label.config(text="Processing...", bootstyle="info")
-    root.update()
+    tz_name = tz_var.get().strip()
+    st_utc = local_to_utc(start, tz_name)
+    et_utc = local_to_utc(end, tz_name)
+    save_display_tz(tz_name)
+    full_q = build_query(selected, fields or time_fields, st_utc, et_utc)
+    return server, token, start, end, full_q
 
-    try:
-        local_tz = timezone("Asia/Kuala_Lumpur")
-        st_dt = datetime.strptime(start, "%Y-%m-%d %H:%M")
-        et_dt = datetime.strptime(end, "%Y-%m-%d %H:%M")
-        st_utc = local_tz.localize(st_dt).astimezone(timezone("UTC")).strftime("%Y-%m-%dT%H%M")
-        et_utc = local_tz.localize(et_dt).astimezone(timezone("UTC")).strftime("%Y-%m-%dT%H%M")
-        cat_q = " OR ".join([f'detection.category:"{c}"' for c in selected])
-        time_q = f"detection.created_timestamp:[{st_utc} TO {et_utc}]"
-        full_q = f"({cat_q}) AND {time_q}"
-        encoded = urllib.parse.quote(full_q)
-        url = f"https://{server}/api/v2.5/search/detections/?page_size=5000&query_string={encoded}"
-        headers = {"Authorization": f"Token {token}"}
-
-        with requests.Session() as sess:
-            sess.mount("https://", SystemCertAdapter())
-            resp = sess.get(url, headers=headers)
-            resp.raise_for_status()
-
-        dl = os.path.join(os.path.expanduser("~"), "Downloads")
-        fname = f"detections_{start}_{end}.json".replace(" ", "T").replace(":", "").replace("-", "")
-        path = os.path.join(dl, fname)
-        cnt = 1
-        while os.path.exists(path):
-            path = os.path.join(dl, f"{fname.split('.')[0]}_{cnt}.json")
-            cnt += 1
+def excel_tz():
+    return tz_var.get().strip() if local_ts_var.get() else None
 
-        stored_filename = path
-        with open(path, 'w') as f:
-            f.write(resp.text)
+def new_summary():
+    return Summary() if summary_var.get() else None
+
+def enrich_form():
+    """(server, token) for Flatten's host/account lookups, or None."""
+    server = vectra_server_entry.get().strip()
+    token = api_key_entry.get().strip()
+    return (server, token) if enrich_var.get() and server and token else None
+
+def set_busy(busy):
+    state = 'disabled' if busy else 'normal'
+    for btn in (submit_button, flatten_btn, preview_btn, pipeline_button):
+        btn.config(state=state)
+
+def set_status(text, style):
+    status_label.config(text=text, bootstyle=style)
+
+# Worker outcome -> status line, dialogs and progress bar (posted to the main thread)
+def report_failure(e):
+    if isinstance(e, Cancelled):
+        progress.finish("Cancelled.")
+        ui.post(set_status, "Cancelled.", "warning")
+    else:
+        progress.finish("Failed.")
+        ui.post(messagebox.showerror, "Error", str(e))
+        ui.post(set_status, "Failed.", "danger")
 
-        messagebox.showinfo("Success", f"Data saved to: {path}")
-        status_label.config(text=f"File saved: {path}", bootstyle="success")
+# Query execution (worker thread)
+def run_query(server, token, start, end, full_q, cancel, brains=None, summary=None):
+    global stored_filename
+    try:
+        # Pipeline without the xlsx stage: pages are streamed into the JSON
+        metrics = RunMetrics(f"query:{'+'.join(time_fields)}")
+        path = output_path(start, end, "merged" if brains else None)
+        if brains:
+            run_fanout(brains, full_q, path, metrics=metrics, on_progress=progress.report,
+                       cancel=cancel, summary=summary)
+        else:
+            run_pipeline(server, token, full_q, path, dedupe=False, metrics=metrics,
+                         on_progress=progress.report, cancel=cancel, summary=summary)
+        stored_filename = path
+        summary = publish(metrics, path, VERBOSE)
+        progress.finish()
+        ui.post(messagebox.showinfo, "Success", f"Data saved to: {path}")
+        ui.post(set_status, f"File saved: {path}\n{summary}", "success")
     except Exception as e:
-        messagebox.showerror("Error", str(e))
-        status_label.config(text="Failed.", bootstyle="danger")
+        report_failure(e)
     finally:
-        submit_button.config(state='normal')
+        ui.post(set_busy, False)
 
-# Excel flattening
-def flatten_to_excel():
+# One-click fetch + flatten (no JSON re-read)
+def run_pipeline_export(server, token, start, end, full_q, cancel, tz, brains=None, summary=None,
+                        enrich=False):
     global stored_filename
+    enricher = None
     try:
-        if not stored_filename:
-            messagebox.showerror("Error", "Run query first.")
-            return
-        with open(stored_filename) as jf:
-            data = json.load(jf)
-        if 'results' not in data or not isinstance(data['results'], list):
-            messagebox.showerror("Error", "No 'results' in JSON.")
+        metrics = RunMetrics(f"pipeline:{'+'.join(time_fields)}")
+        path = output_path(start, end, "merged" if brains else None)
+        xlsx = path.replace('.json', '.xlsx')
+        if enrich and not brains:
+            enricher = Enricher(server, token, metrics=metrics, cancel=cancel)
+        if brains:
+            count, _ = run_fanout(brains, full_q, path, xlsx, on_progress=progress.report,
+                                  tz=tz, metrics=metrics, cancel=cancel, summary=summary)
+        else:
+            count = run_pipeline(server, token, full_q, path, xlsx, on_progress=progress.report,
+                                 tz=tz, metrics=metrics, cancel=cancel, summary=summary,
+                                 enricher=enricher)
+        stored_filename = path
+        summary = publish(metrics, xlsx, VERBOSE)
+        progress.finish()
+        ui.post(messagebox.showinfo, "Success", f"{count} detections saved to:\n{path}\n{xlsx}")
+        ui.post(set_status, f"Excel saved: {xlsx}\n{summary}", "success")
+    except Exception as e:
+        report_failure(e)
+    finally:
+        if enricher is not None:
+            enricher.close()
+        ui.post(set_busy, False)
+
+# Excel flattening (worker thread)
+def flatten_to_excel(json_path, tz, cancel, summary=None, enrich=None):
+    export = writer = enricher = None
+    try:
+        metrics = RunMetrics("flatten")
+        # Records are decoded batch by batch from a memory map of the export,
+        # so the file never sits in memory as text or as one object tree
+        export = MappedExport(json_path)
+        batches = export.batches(FLATTEN_BATCH)
+        with metrics.timer("parse"):
+            batch = next(batches, [])
+        if not batch:
+            progress.finish("Failed.")
+            ui.post(messagebox.showerror, "Error", "No 'results' in JSON.")
+            ui.post(set_status, "Failed.", "danger")
             return
-        flat = [flatten_json(it, flatten_keys) for it in data['results']]
-        # post-process special keys
-        for sk in special_expand_keys:
-            static = special_static_values.get(sk, set())
-            max_dyn = max(len([i for i in rec.get(f"sorted_{sk}", []) if str(i).strip().lower() not in static]) for rec in flat)
-            max_st = max(len([i for i in rec.get(f"sorted_{sk}", []) if str(i).strip().lower() in static]) for rec in flat)
-            for rec in flat:
-                sl = rec.get(f"sorted_{sk}", [])
-                dyn = [i for i in sl if str(i).strip().lower() not in static]
-                stc = [i for i in sl if str(i).strip().lower() in static]
-                for i in range(max_dyn): rec[f"{sk}_{i+1}"] = dyn[i] if i < len(dyn) else ''
-                for j in range(max_st): rec[f"{sk}_{max_dyn+j+1}"] = stc[j] if j < len(stc) else ''
-                rec.pop(f"sorted_{sk}", None)
-        df = pd.DataFrame(flat).fillna("N/A")
-        xlsx = stored_filename.replace('.json', '.xlsx')
-        df.to_excel(xlsx, index=False)
-        messagebox.showinfo("Success", f"Excel saved: {xlsx}")
-        status_label.config(text=f"Excel saved: {xlsx}", bootstyle="success")
+        # Merged multi-brain exports carry a source_brain column
+        keys = fanout_keys if 'source_brain' in batch[0] else flatten_keys
+        if enrich and 'source_brain' not in keys:
+            # One bulk lookup per batch; hosts/accounts seen before are memoised
+            enricher = Enricher(*enrich, metrics=metrics, cancel=cancel)
+            keys = keys + enrich_keys
+        xlsx = json_path.replace('.json', '.xlsx')
+        # Rows are spilled as they're flattened; tag columns are sized on close
+        writer = SpillWriter(xlsx, tz=tz)
+        while batch:
+            if enricher is not None:
+                with metrics.timer("enrich"):
+                    enricher.enrich(batch)
+            # Timed per batch: a timer per record costs more than it measures
+            with metrics.timer("flatten"):
+                rows = [flatten_json(it, keys) for it in batch]
+                if summary is not None:
+                    summary.add_many(batch)
+            with metrics.timer("spill"):
+                writer.write_many(rows)
+            if cancel.is_set():
+                raise Cancelled("Flatten cancelled")
+            progress.report(export.done // 1024, export.size // 1024)
+            with metrics.timer("parse"):
+                batch = next(batches, [])
+        if summary is not None:
+            summary.write_json(summary_path(json_path))
+            summary.attach(writer)
+        with metrics.timer("write_xlsx"):
+            writer.close()
+        metrics.count("records", writer.count)
+        summary = publish(metrics, xlsx, VERBOSE)
+        progress.finish()
+        ui.post(messagebox.showinfo, "Success", f"Excel saved: {xlsx}")
+        ui.post(set_status, f"Excel saved: {xlsx}\n{summary}", "success")
+    except Exception as e:
+        if writer is not None:
+            writer.discard()
+        report_failure(e)
+    finally:
+        if export is not None:
+            export.close()
+        if enricher is not None:
+            enricher.close()
+        ui.post(set_busy, False)
+
+# Export queue: same form, any timestamp-field variant, run alongside other jobs
+def queue_job():
+    if brains:
+        # Queued jobs run against one brain; fan-out goes through Run Query / Run + Flatten
+        messagebox.showerror("Export queue", "The queue exports from a single brain.\n"
+                             "Cancel the brains file dialog to return to single brain mode.")
+        return
+    variant = jobs.variant
+    fields = time_field_sets[variant]
+    form = checked_form(fields)
+    if not form:
+        return
+    server, token, start, end, full_q = form
+    path = output_path(start, end, variant, jobs.reserved_paths())
+    jobs.submit(Job(f"{variant} {server} {start} - {end}", server, token, full_q, path,
+                    path.replace('.json', '.xlsx'), dedupe=len(fields) > 1, tz=excel_tz(),
+                    summary=bool(summary_var.get()), enrich=bool(enrich_var.get())))
+    set_status(f"Queued {variant} export ({len(jobs.queue.jobs)} jobs)", "info")
+
+# Result preview (worker loads the export into columns, the window renders on the main thread)
+def load_preview_worker(json_path, cancel):
+    try:
+        model = load_preview(json_path, cancel, progress.report)
+        progress.finish()
+        ui.post(PreviewWindow, root, model, os.path.basename(json_path))
+        ui.post(set_status, f"Preview: {model.size} detections", "info")
     except Exception as e:
-        messagebox.showerror("Error", str(e))
+        report_failure(e)
+    finally:
+        ui.post(set_busy, False)
+
+# Thread wrappers: read the form here on the main thread, hand plain values to the worker
+# (--profile / Ctrl+Shift+P wraps each run in core.profiling)
+def export_path(): return stored_filename
+
+def start_worker(fn, label, *args, unit="detections", **kwargs):
+    set_busy(True)
+    set_status("Processing...", "info")
+    cancel = progress.start(unit)
+    work = partial(fn, *args, cancel=cancel, **kwargs)
+    threading.Thread(target=run_profiled, args=(work, label, export_path), daemon=True).start()
+
+def checked_form(fields=None):
+    try:
+        return read_form(fields)
+    except ValueError as e:
+        messagebox.showerror("Input Error", str(e))
+        return None
+
+def threaded_query():
+    form = checked_form()
+    if form:
+        start_worker(run_query, "query", *form, brains=brains, summary=new_summary())
+
+def threaded_flatten():
+    if not stored_filename:
+        messagebox.showerror("Error", "Run query first.")
+        return
+    start_worker(flatten_to_excel, "flatten", stored_filename, excel_tz(), unit="KB",
+                 summary=new_summary(), enrich=enrich_form())
+
+def threaded_preview():
+    if not stored_filename:
+        messagebox.showerror("Error", "Run query first.")
+        return
+    start_worker(load_preview_worker, "preview", stored_filename, unit="KB")
 
-# Thread wrappers
-def threaded_query(): threading.Thread(target=run_query).start()
-def threaded_flatten(): threading.Thread(target=flatten_to_excel).start()
+def threaded_pipeline():
+    form = checked_form()
+    if form:
+        start_worker(run_pipeline_export, "pipeline", *form, tz=excel_tz(), brains=brains,
+                     summary=new_summary(), enrich=bool(enrich_var.get()))
+
+# Fan-out mode: a brains file replaces the FQDN/token fields (cancel the dialog to go back)
+def load_brains_file():
+    global brains
+    path = filedialog.askopenfilename(filetypes=[("JSON files", "*.json"), ("All files", "*.*")])
+    if not path:
+        brains = None
+        brains_label.config(text="")
+        set_status("Single brain mode", "info")
+        return
+    try:
+        brains = load_brains(path)
+    except (OSError, ValueError) as e:
+        messagebox.showerror("Brains file", str(e))
+        return
+    names = ", ".join(b["name"] for b in brains)
+    brains_label.config(text=f"{len(brains)} brains")
+    set_status(f"Fan-out mode: {names}", "info")
+
+def toggle_profile(evt=None):
+    state = "enabled" if toggle_profiling() else "disabled"
+    status_label.config(text=f"Profiling {state} (output next to the export)", bootstyle="warning")
 
 def open_url(evt=None):
+    import webbrowser
     webbrowser.open("https://github.com/alReaperz/KaizenKit/blob/main/Vectra/Vectra-Detection-Created-Time-Exporter-API-2.5.py")
 
 # GUI Setup
 def main():
     global root, vectra_server_entry, api_key_entry, \
-           start_time_entry, end_time_entry, submit_button, status_label
+           start_time_entry, end_time_entry, submit_button, flatten_btn, preview_btn, pipeline_button, \
+           status_label, local_ts_var, tz_var, summary_var, enrich_var, ui, progress, jobs, brains_label
 
     root = ttk.Window(themename="darkly")
     root.title("Vectra Detection Created Time Exporter API 2.5 by alReaperz")
+    ui = UiQueue(root)
     style = ttk.Style("darkly")
     add_theme_switcher(root, style)
 
@@ -199,9 +342,15 @@ def main():
         entries.append(ent)
     vectra_server_entry, api_key_entry, start_time_entry, end_time_entry = entries
 
+    # Multi-brain fan-out
+    ttk.Button(frame, text="Brains...", bootstyle="secondary-outline",
+               command=load_brains_file).grid(row=0, column=2, padx=(5, 0), pady=5)
+    brains_label = ttk.Label(frame, text="")
+    brains_label.grid(row=1, column=2, padx=(5, 0), sticky='w')
+
     # Categories
     cat_frame = ttk.Frame(frame)
-    cat_frame.grid(row=4, column=0, columnspan=2, pady=5, sticky='w')
+    cat_frame.grid(row=4, column=0, columnspan=3, pady=5, sticky='w')
     ttk.Label(cat_frame, text="Select Detection Categories:").grid(row=0, column=0, columnspan=len(categories), sticky='w')
     for idx, (lbl, _, dflt) in enumerate(categories):
         var = tk.IntVar(value=dflt)
@@ -209,27 +358,62 @@ def main():
         cb = ttk.Checkbutton(cat_frame, text=lbl, variable=var)
         cb.grid(row=1, column=idx, padx=5)
 
+    # Timezone for Start/End and (optionally) the Excel timestamps
+    tz_frame = ttk.Frame(frame)
+    tz_frame.grid(row=5, column=0, columnspan=3, pady=5, sticky='w')
+    ttk.Label(tz_frame, text="Timezone:").pack(side='left')
+    tz_var = tk.StringVar(value=load_display_tz())
+    ttk.Combobox(tz_frame, textvariable=tz_var, values=common_zones, width=24).pack(side='left', padx=5)
+    local_ts_var = tk.IntVar(value=0)
+    ttk.Checkbutton(tz_frame, text="Excel timestamps in this timezone", variable=local_ts_var).pack(side='left', padx=5)
+    summary_var = tk.IntVar(value=0)
+    ttk.Checkbutton(tz_frame, text="Summary sheets", variable=summary_var).pack(side='left', padx=5)
+    enrich_var = tk.IntVar(value=0)
+    ttk.Checkbutton(tz_frame, text="Host/account details", variable=enrich_var).pack(side='left', padx=5)
+
     submit_button = ttk.Button(frame, text="Run Query", bootstyle="primary", command=threaded_query)
-    submit_button.grid(row=5, column=0, columnspan=2, pady=(10,5), sticky='ew')
+    submit_button.grid(row=6, column=0, columnspan=3, pady=(10,5), sticky='ew')
 
     flatten_btn = ttk.Button(frame, text="Flatten to Excel", bootstyle="secondary", command=threaded_flatten)
-    flatten_btn.grid(row=6, column=0, columnspan=2, pady=5, sticky='ew')
+    flatten_btn.grid(row=7, column=0, columnspan=2, pady=5, sticky='ew')
+
+    preview_btn = ttk.Button(frame, text="Preview", bootstyle="secondary-outline", command=threaded_preview)
+    preview_btn.grid(row=7, column=2, padx=(5, 0), pady=5, sticky='ew')
+
+    pipeline_button = ttk.Button(frame, text="Run + Flatten to Excel", bootstyle="success", command=threaded_pipeline)
+    pipeline_button.grid(row=8, column=0, columnspan=3, pady=5, sticky='ew')
 
     status_label = ttk.Label(frame, text="Waiting for input...", bootstyle="light")
-    status_label.grid(row=7, column=0, columnspan=2, pady=10, sticky='w')
+    status_label.grid(row=9, column=0, columnspan=3, pady=10, sticky='w')
+
+    progress = ProgressPanel(frame, ui, row=10, columnspan=3)
+
+    # Export queue (defaults to this window's timestamp field)
+    variant = next(k for k, v in time_field_sets.items() if v == time_fields)
+    jobs = JobPanel(frame, ui, row=11, columnspan=3, on_add=queue_job, variants=list(time_field_sets),
+                    variant=variant, verbose=VERBOSE)
+    frame.rowconfigure(11, weight=1)
 
     frame.columnconfigure(1, weight=1)
 
     info = tk.Label(
     root,
-    text="?", 
-    fg="blue", 
-    cursor="hand2", 
+    text="?",
+    fg="blue",
+    cursor="hand2",
     font=("Arial", 12, "bold")
     )
     info.place(relx=1.0, rely=1.0, anchor='se', x=-10, y=-10)
     info.bind("<Button-1>", open_url)
 
+    # Hidden profiling toggle
+    root.bind("<Control-Shift-P>", toggle_profile)
+
+    def on_close():
+        jobs.queue.close()
+        root.destroy()
+    root.protocol("WM_DELETE_WINDOW", on_close)
+
     root.mainloop()
 
 if __name__ == '__main__':
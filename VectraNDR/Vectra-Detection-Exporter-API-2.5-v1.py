@@ -1,25 +1,16 @@
 import os
-import ssl
-import requests
-from datetime import datetime
-from pytz import timezone
+from core.tz import load_display_tz, local_to_utc
+from core.pipeline import open_session
+from core import jsoncodec
 import tkinter as tk
 from tkinter import messagebox
-import pandas as pd
-import json
 import webbrowser  # Used to open the URL
 
 # Global variable to store the output filename
 stored_filename = None
 
-# Custom HTTPS Adapter to use the system's root CA certificates
-class SystemCertAdapter(requests.adapters.HTTPAdapter):
-    def __init__(self, *args, **kwargs):
-        self.ssl_context = ssl.create_default_context()
-        super().__init__(*args, **kwargs)
-    def init_poolmanager(self, *args, **kwargs):
-        kwargs["ssl_context"] = self.ssl_context
-        return super().init_poolmanager(*args, **kwargs)
+# HTTPS sessions use the system's root CA certificates (core.pipeline.open_session);
+# requests and pandas are imported on first use so the window opens quickly
 
 # ---------------------------------------------------------------------------
 # Variables for controlling expansion behavior:
@@ -92,6 +83,7 @@ def flatten_json(json_object, keys_to_include):
 # Run query and process data
 def run_query():
     global stored_filename  # Use the global stored_filename variable
+    import requests
 
     # Get user inputs from the GUI
     vectra_server = vectra_server_entry.get().strip()
@@ -110,20 +102,17 @@ def run_query():
     root.update()
 
     try:
-        # Convert local (GMT+8) time to UTC
-        local_tz = timezone("Asia/Kuala_Lumpur")
-        start_time_utc = local_tz.localize(datetime.strptime(start_time, "%Y-%m-%d %H:%M"))\
-                                 .astimezone(timezone("UTC")).strftime("%Y-%m-%dT%H%M")
-        end_time_utc = local_tz.localize(datetime.strptime(end_time, "%Y-%m-%d %H:%M"))\
-                               .astimezone(timezone("UTC")).strftime("%Y-%m-%dT%H%M")
+        # Convert local (display timezone setting) time to UTC
+        tz_name = load_display_tz()
+        start_time_utc = local_to_utc(start_time, tz_name)
+        end_time_utc = local_to_utc(end_time, tz_name)
 
         # Build the URL and headers
         url = f"https://{vectra_server}/api/v2.5/search/detections/?page_size=5000&query_string=detection.first_timestamp%3A%5B{start_time_utc}%20TO%20{end_time_utc}%5D"
         headers = {"Authorization": f"Token {api_key}"}
 
         # Make the API call
-        with requests.Session() as session:
-            session.mount("https://", SystemCertAdapter())
+        with open_session() as session:
             response = session.get(url, headers=headers)
             response.raise_for_status()  # Raise error for HTTP codes >= 400
 
@@ -137,8 +126,8 @@ def run_query():
             counter += 1
 
         stored_filename = output_path
-        with open(output_path, "w") as output_file:
-            output_file.write(response.text)
+        with open(output_path, "wb") as output_file:
+            output_file.write(response.content)
 
         messagebox.showinfo("Success", f"Data saved to: {output_path}")
         status_label.config(text=f"File saved: {output_path}", fg="green")
@@ -155,14 +144,15 @@ def run_query():
 # Flatten the JSON to Excel with fixed columns for special keys
 def flatten_json_to_excel():
     global stored_filename  # Access the global stored_filename variable
+    import pandas as pd
     try:
         if stored_filename is None:
             messagebox.showerror("Error", "No data file available. Please run the query first.")
             return
 
         # Read the stored JSON file
-        with open(stored_filename, "r") as json_file:
-            data = json.load(json_file)
+        with open(stored_filename, "rb") as json_file:
+            data = jsoncodec.load(json_file)
 
         # Check that "results" exists and is a list
         if "results" not in data or not isinstance(data["results"], list):
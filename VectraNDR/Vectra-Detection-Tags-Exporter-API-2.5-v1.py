@@ -2,45 +2,68 @@
 Vectra Detection Tags Exporter API 2.5 v1 by alReaperz
 
 Summary:
-- GUI tool to query the Vectra Detection API for specific detection IDs loaded from a CSV file.
-- Imports detection IDs (CSV header: 'detection_id', case-insensitive) via file-browse dialog (handles BOM).
+- GUI tool to query the Vectra Detection API for specific detection IDs loaded from CSV/text files.
+- Imports detection IDs from one or more files via file-browse dialog (core/idload.py): CSVs use the
+  'detection_id' column (case-insensitive, handles BOM), other files one ID per line. Files are streamed on a
+  background thread with progress/Cancel; IDs are deduplicated into a compact integer array and invalid rows
+  are counted (samples printed under “-verbose”) instead of aborting the load.
 - Accepts user inputs: Vectra Brain FQDN and API token.
 - Validates that the given Vectra FQDN can be resolved via DNS; errors out early if not.
-- Batches IDs in groups of 10, builds an OR-based query per batch, retrieves data from “/api/v2.5/search/detections/”,
-  and combines all results into one list.
-- Runs both the query and the “flatten JSON→Excel” steps on background threads so the GUI never freezes.
+- Packs the IDs into as few queries as fit in a URL (core/idpack.py): sorted and deduplicated, consecutive IDs
+  collapsed into “detection.id:[a TO b]” ranges and the rest grouped under one “detection.id:(...)” term, each
+  query filled up to the “id_query_bytes” budget in the shared settings. Retrieves data from
+  “/api/v2.5/search/detections/” over one session and combines all results into one list.
+- Runs both the query and the “flatten JSON→Excel” steps on background threads so the GUI never freezes;
+  workers update the window only through a Tk-side queue (core/ui.py). A progress bar shows batches done,
+  throughput and ETA, and Cancel stops the run between batches, pages and download chunks.
 - Saves full JSON output (named “detection_tags_<timestamp>.json”) into the user's Downloads folder, ensuring no
   filename collision.
 - Clears the API token field after successfully saving JSON to avoid leaving credentials on screen.
 - Optional “-verbose” (or “-v”/“--verbose”) CLI flag: when present, prints tracebacks and console logs to stdout
   for easier debugging.
+- Every query/flatten run records per-stage timings (DNS, TLS connect, time-to-first-byte, download rate, parse,
+  flatten, DataFrame build, Excel write), record counts and peak memory. The summary is shown in the status bar,
+  the full breakdown printed under “-verbose”, and the metrics saved as “<output>.metrics.json” (core/metrics.py).
+- Optional “--profile” CLI flag (or hidden Ctrl+Shift+P toggle): profiles query/flatten runs and writes
+  “.pstats” and collapsed-stack files next to the output, printing the top hot functions (core/profiling.py).
 - Flattening: extracts each detection's 'id' plus its 'tags', then sorts tags into “dynamic” vs. “static” sets
   (`{'false positive','true positive',''}`). It creates N columns for all dynamic tags (first) followed by M columns
   for all static tags (second), padding with empty strings when fewer tags exist. If the target .xlsx is open,
   shows a friendly “file in use” error instead of crashing.
+- “Write Tags Back” (core/tagsync.py): pick the edited xlsx, and only detections whose tag set changed versus the
+  saved JSON are listed in a dry-run report (“<export>.tagsync.csv”). On confirmation each is PATCHed to
+  “/api/v2.5/tagging/detection/<id>” from a few concurrent, rate-limited workers (same FQDN/token fields); the
+  report gets a status per detection and the JSON export is updated with the applied tags.
+- Startup stays fast: pandas is imported on the first flatten and requests/SSL (via core.pipeline.open_session)
+  on the first query, not when the window opens. Check with “python -m bench.importtime”.
 - Includes an info-label (“?”) that links to the GitHub repository for this tool.
 
 Requirements (Python 3.x):
-  os, ssl, requests, datetime, tkinter (messagebox & filedialog), pandas, json, webbrowser, threading, csv,
+  os, ssl, requests, datetime, tkinter (messagebox & filedialog), pandas, json, webbrowser, threading, csv, array,
   urllib.parse, sys, traceback, socket
 """
 
 import os
-import ssl
-import requests
 from datetime import datetime
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from tkinter import messagebox, filedialog, END
-import pandas as pd
-import json
-import webbrowser
 import threading
-import csv
-import urllib.parse
+from functools import partial
 import sys
 import traceback
 import socket
+import time
+from core.metrics import RunMetrics, publish
+from core import jsoncodec
+from core.jsonstream import MappedExport
+from core.pipeline import Cancelled, build_url, iter_pages, open_session
+from core.idpack import pack_ids
+from core.idload import load_ids
+from core.tagsync import (apply_changes, diff_tags, read_export_tags, read_sheet_tags,
+                          report_path, update_export, write_report)
+from core.profiling import run_profiled, toggle_profiling
+from core.ui import UiQueue, ProgressPanel
 
 # ------------------------- Theme‐Switcher Helper ------------------------- #
 
@@ -68,9 +91,10 @@ VERBOSE = any(arg in ('-verbose','--verbose','-v') for arg in sys.argv[1:])
 if VERBOSE:
     print("Verbose mode enabled")
 
-detection_ids = []         # List of IDs imported from CSV
+detection_ids = []         # Sorted unique IDs (array) from the loaded files
 stored_filename = None     # Path to saved JSON
-BATCH_SIZE = 10            # Number of IDs per API call batch
+ui = None                  # Set in main(); worker -> Tk queue
+progress = None            # Set in main(); progress bar + Cancel
 
 # Keys to flatten
 special_expand_keys = ['tags']
@@ -78,18 +102,6 @@ special_static_values = { 'tags': {'false positive', 'true positive', ''} }
 flatten_keys = ["id", "state"] + special_expand_keys
 
 
-# ------------------------- Custom HTTPS Adapter ------------------------- #
-
-class SystemCertAdapter(requests.adapters.HTTPAdapter):
-    def __init__(self, *args, **kwargs):
-        self.ssl_context = ssl.create_default_context()
-        super().__init__(*args, **kwargs)
-
-    def init_poolmanager(self, *args, **kwargs):
-        kwargs['ssl_context'] = self.ssl_context
-        return super().init_poolmanager(*args, **kwargs)
-
-
 # ------------------------- Flatten JSON Helper ------------------------- #
 
 def flatten_json(json_obj, keys_to_include):
@@ -125,110 +137,118 @@ def flatten_json(json_obj, keys_to_include):
     return flat
 
 
-# ------------------------- CSV Loading ------------------------- #
+# ------------------------- ID Loading ------------------------- #
+# Files are picked on the main thread and streamed on a worker (core/idload.py).
 
 def load_csv():
-    global detection_ids
-    path = filedialog.askopenfilename(
-        filetypes=[('CSV files','*.csv'), ('All files','*.*')]
+    paths = filedialog.askopenfilenames(
+        filetypes=[('CSV files','*.csv'), ('Text files','*.txt'), ('All files','*.*')]
     )
-    if not path:
+    if not paths:
         return
+    status_label.config(text='Loading IDs...', foreground="blue")
+    start_worker(load_ids_worker, 'load_ids', list(paths), unit='KB')
 
+def load_ids_worker(paths, cancel):
     try:
-        # Handle BOM and encoding
-        with open(path, newline='', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f)
-            headers_lc = [h.strip().lower() for h in (reader.fieldnames or [])]
-            if 'detection_id' not in headers_lc:
-                raise ValueError("CSV must have 'detection_id' header (case-insensitive). Found: %s" % reader.fieldnames)
-
-            # Get actual header name for values
-            col = reader.fieldnames[headers_lc.index('detection_id')]
-            detection_ids = [
-                row[col].strip()
-                for row in reader
-                if row.get(col) and row[col].strip()
-            ]
-
-            if not detection_ids:
-                messagebox.showwarning(
-                    "Warning",
-                    "CSV was loaded but contained no non-empty detection_id values."
-                )
-
-        csv_label.config(text=os.path.basename(path))
-        status_label.config(text=f"Loaded {len(detection_ids)} IDs", foreground="green")
+        result = load_ids(paths, cancel, progress.report)
+        progress.finish()
+        ui.post(ids_loaded, result)
 
-        if VERBOSE:
-            print(f"Loaded IDs from {path}: {detection_ids}")
+    except Cancelled:
+        cancelled()
 
     except Exception as e:
-        detection_ids = []
         if VERBOSE:
-            print(f"Error loading CSV {path}: {e}")
+            print(f"Error loading IDs from {paths}: {e}")
             traceback.print_exc()
-        messagebox.showerror("Error", f"Failed to load CSV:\n{e}")
-        status_label.config(text="Failed to load CSV", foreground="red")
+        progress.finish('Failed.')
+        ui.post(messagebox.showerror, "Error", f"Failed to load IDs:\n{e}")
+        ui.post(set_status, "Failed to load IDs", "red")
 
+    finally:
+        ui.post(set_busy, False)
 
-# ------------------------- Run Query + Save JSON ------------------------- #
+def ids_loaded(result):
+    global detection_ids
+    detection_ids = result.ids
+    names = [os.path.basename(p) for p in result.files]
+    csv_label.config(text=names[0] if len(names) == 1 else f"{len(names)} files")
+    status_label.config(text=result.summary(), foreground="orange" if result.invalid else "green")
 
-def run_query():
-    global stored_filename, detection_ids
+    if not detection_ids:
+        messagebox.showwarning("Warning", "No valid detection IDs were found in the selected file(s).")
 
-    vectra = vectra_server_entry.get().strip()
-    token = api_key_entry.get().strip()
+    if VERBOSE:
+        print(result.summary())
+        for path, line, value in result.samples:
+            print(f"  invalid {path}:{line}: {value!r}")
 
-    if not vectra or not token:
-        messagebox.showerror('Input Error', 'Vectra FQDN and API token are required!')
-        return
+
+# ------------------------- Worker -> GUI helpers ------------------------- #
+# Workers never touch widgets directly: everything goes through ui.post, which
+# runs it on the Tk main thread.
+
+def set_status(text, color):
+    status_label.config(text=text, foreground=color)
+
+def set_busy(busy):
+    state = ttk.DISABLED if busy else ttk.NORMAL
+    submit_button.config(state=state)
+    flatten_button.config(state=state)
+    load_btn.config(state=state)
+    write_back_button.config(state=state)
+
+def cancelled():
+    progress.finish('Cancelled.')
+    ui.post(set_status, 'Cancelled.', "orange")
+
+
+# ------------------------- Run Query + Save JSON ------------------------- #
+
+def run_query(vectra, token, ids, cancel):
+    global stored_filename
+    import requests  # Deferred to the first query (see module docstring)
 
     # DNS resolution check
     try:
         socket.gethostbyname(vectra)
     except socket.error:
-        messagebox.showerror('Input Error',
-                             'Cannot resolve Vectra FQDN. Please check the hostname.')
-        return
-
-    if not detection_ids:
-        messagebox.showerror('Input Error', 'Please load a CSV with detection IDs first.')
+        progress.finish('Failed.')
+        ui.post(messagebox.showerror, 'Input Error',
+                'Cannot resolve Vectra FQDN. Please check the hostname.')
+        ui.post(set_status, 'Request failed.', "red")
+        ui.post(set_busy, False)
         return
 
-    submit_button.config(state=ttk.DISABLED)
-    status_label.config(text='Processing request...', foreground="blue")
-    root.update_idletasks()
-
     try:
+        metrics = RunMetrics('tags:query')
+        metrics.probe(vectra)
         all_results = []
 
-        # Batch IDs into groups of BATCH_SIZE
-        for idx in range(0, len(detection_ids), BATCH_SIZE):
-            batch = detection_ids[idx:idx+BATCH_SIZE]
-            batch_num     = idx // BATCH_SIZE + 1
-            total_batches = (len(detection_ids) - 1) // BATCH_SIZE + 1
-            status_label.config(text=f"Processing batch {batch_num}/{total_batches}...", foreground="blue")
-            root.update_idletasks()
+        # Range/grouped ID queries, each filled up to the URL budget
+        with metrics.timer('pack_ids'):
+            queries = pack_ids(ids)
+        if VERBOSE:
+            print(f"{len(ids)} IDs packed into {len(queries)} queries")
 
-            # Build OR‐based query string
-            q = ' OR '.join([f'detection.id:\"{id_}\"' for id_ in batch])
-            enc = urllib.parse.quote(q)
-            url = f"https://{vectra}/api/v2.5/search/detections/?page_size=5000&query_string={enc}"
+        with open_session() as s:
+            for batch_num, q in enumerate(queries, 1):
+                if cancel.is_set():
+                    raise Cancelled()
+                url = build_url(vectra, q)
 
-            if VERBOSE:
-                print(f"Query URL: {url}")
-
-            headers = {'Authorization': f'Token {token}'}
-            with requests.Session() as s:
-                s.mount('https://', SystemCertAdapter())
-                resp = s.get(url, headers=headers)
-                resp.raise_for_status()
-                json_data = resp.json().get('results', [])
+                if VERBOSE:
+                    print(f"Query URL: {url}")
+
+                json_data = []
+                for page in iter_pages(s, url, token, metrics, cancel):
+                    json_data.extend(page)
                 all_results.extend(json_data)
 
                 if VERBOSE:
                     print(f"Batch {batch_num}: Retrieved {len(json_data)} results")
+                progress.report(batch_num, len(queries))
 
         # Save combined JSON into Downloads
         dl = os.path.join(os.path.expanduser('~'), 'Downloads')
@@ -241,51 +261,67 @@ def run_query():
             cnt += 1
 
         stored_filename = out
-        with open(out, 'w') as jf:
-            json.dump({'results': all_results}, jf, indent=2)
+        with metrics.timer('write_json'), open(out, 'wb') as jf:
+            jsoncodec.dump({'results': all_results}, jf, indent=True)
+        metrics.count('records', len(all_results))
+        summary = publish(metrics, out, VERBOSE)
 
         # Notify user + clear API token field
-        messagebox.showinfo('Success', f'Data saved to: {out}')
-        status_label.config(text=f'File saved: {out}', foreground="green")
-        api_key_entry.delete(0, END)
+        progress.finish()
+        ui.post(messagebox.showinfo, 'Success', f'Data saved to: {out}')
+        ui.post(set_status, f'File saved: {out}\n{summary}', "green")
+        ui.post(api_key_entry.delete, 0, END)
 
         if VERBOSE:
             print(f"Full JSON output path: {out}")
 
+    except Cancelled:
+        cancelled()
+
     except requests.exceptions.RequestException as e:
         if VERBOSE:
             print(f"Request error: {e}")
             traceback.print_exc()
-        messagebox.showerror('Request Error', f'Error during API request:\n{e}')
-        status_label.config(text='Request failed.', foreground="red")
+        progress.finish('Failed.')
+        ui.post(messagebox.showerror, 'Request Error', f'Error during API request:\n{e}')
+        ui.post(set_status, 'Request failed.', "red")
 
     except Exception as e:
         if VERBOSE:
             print(f"Unexpected error in run_query: {e}")
             traceback.print_exc()
-        messagebox.showerror('Error', f'An unexpected error occurred:\n{e}')
-        status_label.config(text='An error occurred.', foreground="red")
+        progress.finish('Failed.')
+        ui.post(messagebox.showerror, 'Error', f'An unexpected error occurred:\n{e}')
+        ui.post(set_status, 'An error occurred.', "red")
 
     finally:
-        submit_button.config(state=ttk.NORMAL)
+        ui.post(set_busy, False)
 
 
 # ------------------------- Flatten JSON → Excel ------------------------- #
 
-def flatten_json_to_excel():
-    global stored_filename
+def flatten_json_to_excel(json_path, cancel):
+    import pandas as pd  # Deferred to the first flatten (see module docstring)
 
     try:
-        if not stored_filename:
-            messagebox.showerror('Error', 'No data file available. Please run the query first.')
-            return
-
-        with open(stored_filename, 'r') as jf:
-            data = json.load(jf).get('results', [])
-
-        rows = [flatten_json(item, flatten_keys) for item in data]
+        metrics = RunMetrics('tags:flatten')
+        # Records are decoded from a memory map of the export; only the flat rows are kept
+        rows = []
+        with MappedExport(json_path) as export:
+            batches = export.batches(1000)
+            while True:
+                with metrics.timer('parse'):
+                    batch = next(batches, None)
+                if batch is None:
+                    break
+                with metrics.timer('flatten'):
+                    rows.extend(flatten_json(item, flatten_keys) for item in batch)
+                if cancel.is_set():
+                    raise Cancelled()
+                progress.report(export.done // 1024, export.size // 1024)
 
         # Process tags into separate dynamic/static columns
+        t0 = time.perf_counter()
         for key in special_expand_keys:
             static = special_static_values.get(key, set())
 
@@ -310,43 +346,180 @@ def flatten_json_to_excel():
                 for j in range(max_st):
                     r[f'{key}_{max_dyn+j+1}'] = st[j] if j < len(st) else ''
 
+        metrics.add_time('flatten', time.perf_counter() - t0)
+        if cancel.is_set():
+            raise Cancelled()
+
+        t0 = time.perf_counter()
         df = pd.DataFrame(rows)
-        out_xlsx = stored_filename.replace('.json', '.xlsx')
+        metrics.add_time('dataframe', time.perf_counter() - t0)
+        out_xlsx = json_path.replace('.json', '.xlsx')
 
         try:
-            df.to_excel(out_xlsx, index=False)
+            with metrics.timer('write_xlsx'):
+                df.to_excel(out_xlsx, index=False)
         except PermissionError:
-            messagebox.showerror(
+            progress.finish('Failed.')
+            ui.post(
+                messagebox.showerror,
                 'Permission Error',
                 f"The file:\n\n{out_xlsx}\n\nis currently open. Please close it and try again."
             )
             return
 
-        messagebox.showinfo('Success', f'Excel file created: {out_xlsx}')
-        status_label.config(text=f'Excel saved: {out_xlsx}', foreground="green")
+        metrics.count('records', len(rows))
+        summary = publish(metrics, out_xlsx, VERBOSE)
+        progress.finish()
+        ui.post(messagebox.showinfo, 'Success', f'Excel file created: {out_xlsx}')
+        ui.post(set_status, f'Excel saved: {out_xlsx}\n{summary}', "green")
 
         if VERBOSE:
             print(f"Excel output path: {out_xlsx}")
 
+    except Cancelled:
+        cancelled()
+
     except Exception as e:
         if VERBOSE:
             print(f"Error converting to Excel: {e}")
             traceback.print_exc()
-        messagebox.showerror('Error', f'Error converting to Excel:\n{e}')
+        progress.finish('Failed.')
+        ui.post(messagebox.showerror, 'Error', f'Error converting to Excel:\n{e}')
+
+    finally:
+        ui.post(set_busy, False)
+
+
+# ------------------------- Tag Write-Back ------------------------- #
+# Edited sheet vs. saved JSON -> dry-run report -> confirm -> PATCH (core/tagsync.py).
+
+def diff_worker(json_path, xlsx_path, cancel):
+    try:
+        changes, unknown = diff_tags(read_export_tags(json_path), read_sheet_tags(xlsx_path))
+        report = write_report(report_path(json_path), changes)
+        progress.finish()
+        ui.post(confirm_write_back, json_path, changes, unknown, report)
+
+    except Exception as e:
+        if VERBOSE:
+            print(f"Error comparing {xlsx_path} with {json_path}: {e}")
+            traceback.print_exc()
+        progress.finish('Failed.')
+        ui.post(messagebox.showerror, 'Error', f'Could not compare the sheet with the export:\n{e}')
+        ui.post(set_status, 'Write-back failed.', "red")
+
+    finally:
+        ui.post(set_busy, False)
+
+def confirm_write_back(json_path, changes, unknown, report):
+    skipped = f"\n{len(unknown)} sheet IDs are not in the export and will be skipped." if unknown else ""
+    if not changes:
+        messagebox.showinfo('Write Tags Back', f'No tag changes found.{skipped}')
+        status_label.config(text='No tag changes.', foreground="green")
+        return
+    status_label.config(text=f'{len(changes)} tag changes (dry run): {report}', foreground="blue")
+    if not messagebox.askyesno(
+        'Write Tags Back',
+        f'{len(changes)} detections will be re-tagged.{skipped}\n\nDry-run report:\n{report}\n\nApply now?'
+    ):
+        return
+    vectra = vectra_server_entry.get().strip()
+    token = api_key_entry.get().strip()
+    if not vectra or not token:
+        messagebox.showerror('Input Error', 'Vectra FQDN and API token are required to write tags.')
+        return
+    status_label.config(text='Writing tags...', foreground="blue")
+    start_worker(apply_worker, 'tagsync', vectra, token, json_path, changes, unit='updates')
+
+def apply_worker(vectra, token, json_path, changes, cancel):
+    metrics = RunMetrics('tags:write_back')
+    try:
+        ok = apply_changes(vectra, token, changes, metrics=metrics, cancel=cancel,
+                           on_progress=progress.report)
+        update_export(json_path, changes)
+        report = write_report(report_path(json_path), changes)
+        summary = publish(metrics, json_path, VERBOSE)
+        progress.finish()
+        color = "green" if ok == len(changes) else "orange"
+        ui.post(messagebox.showinfo, 'Write Tags Back',
+                f'{ok} of {len(changes)} detections re-tagged.\nReport: {report}')
+        ui.post(set_status, f'{ok}/{len(changes)} re-tagged. Report: {report}\n{summary}', color)
+
+    except Cancelled:
+        update_export(json_path, changes)
+        write_report(report_path(json_path), changes)
+        cancelled()
+
+    except Exception as e:
+        if VERBOSE:
+            print(f"Error writing tags: {e}")
+            traceback.print_exc()
+        progress.finish('Failed.')
+        ui.post(messagebox.showerror, 'Error', f'Error writing tags:\n{e}')
+        ui.post(set_status, 'Write-back failed.', "red")
+
+    finally:
+        ui.post(set_busy, False)
 
 
 # ------------------------- Thread Wrappers ------------------------- #
+# Inputs are read and validated here, on the main thread; the worker only
+# gets plain values.
+
+def export_path():
+    return stored_filename
+
+def start_worker(fn, label, *args, unit):
+    set_busy(True)
+    cancel = progress.start(unit)
+    work = partial(fn, *args, cancel=cancel)
+    threading.Thread(target=run_profiled, args=(work, label, export_path), daemon=True).start()
 
 def threaded_run_query():
-    threading.Thread(target=run_query).start()
+    vectra = vectra_server_entry.get().strip()
+    token = api_key_entry.get().strip()
+
+    if not vectra or not token:
+        messagebox.showerror('Input Error', 'Vectra FQDN and API token are required!')
+        return
+    if not detection_ids:
+        messagebox.showerror('Input Error', 'Please load a file with detection IDs first.')
+        return
+
+    status_label.config(text='Processing request...', foreground="blue")
+    start_worker(run_query, 'query', vectra, token, detection_ids, unit='batches')
 
 def threaded_flatten():
-    threading.Thread(target=flatten_json_to_excel).start()
+    if not stored_filename:
+        messagebox.showerror('Error', 'No data file available. Please run the query first.')
+        return
+    status_label.config(text='Flattening to Excel...', foreground="blue")
+    start_worker(flatten_json_to_excel, 'flatten', stored_filename, unit='KB')
+
+def threaded_write_back():
+    if not stored_filename:
+        messagebox.showerror('Error', 'No data file available. Please run the query first.')
+        return
+    xlsx = filedialog.askopenfilename(
+        title='Edited tags sheet',
+        initialdir=os.path.dirname(stored_filename),
+        initialfile=os.path.basename(stored_filename.replace('.json', '.xlsx')),
+        filetypes=[('Excel files', '*.xlsx'), ('All files', '*.*')]
+    )
+    if not xlsx:
+        return
+    status_label.config(text='Comparing sheet with export...', foreground="blue")
+    start_worker(diff_worker, 'tagsync_diff', stored_filename, xlsx, unit='detections')
+
+def toggle_profile(event=None):
+    state = 'enabled' if toggle_profiling() else 'disabled'
+    status_label.config(text=f'Profiling {state} (output next to the export)', foreground="orange")
 
 
 # ------------------------- Open GitHub URL ------------------------- #
 
 def open_url(event=None):
+    import webbrowser
     webbrowser.open(
         'https://github.com/alReaperz/KaizenKit/blob/main/Vectra/Vectra-Detection-Tags-Exporter-API-2.5-v1.py'
     )
@@ -355,11 +528,13 @@ def open_url(event=None):
 # ------------------------- Main GUI ------------------------- #
 
 def main():
-    global root, csv_label, status_label, vectra_server_entry, api_key_entry, submit_button
+    global root, csv_label, status_label, vectra_server_entry, api_key_entry, submit_button, \
+           flatten_button, load_btn, write_back_button, ui, progress
 
     # Create a ttkbootstrap window with “darkly” theme by default
     root = ttk.Window(themename="darkly")
     root.title('Vectra Detection Tags Exporter API 2.5 v1 by alReaperz')
+    ui = UiQueue(root)
 
     # Obtain the Style object so we can switch themes later
     style = ttk.Style()
@@ -371,16 +546,16 @@ def main():
     content = ttk.Frame(root, padding=10)
     content.pack(fill="both", expand=True)
 
-    # Row 0: Load CSV
+    # Row 0: Load ID files
     load_btn = ttk.Button(
         content,
-        text='Load CSV',
+        text='Load IDs',
         command=load_csv,
         bootstyle=PRIMARY
     )
     load_btn.grid(row=0, column=0, pady=5)
 
-    csv_label = ttk.Label(content, text='No CSV loaded')
+    csv_label = ttk.Label(content, text='No IDs loaded')
     csv_label.grid(row=0, column=1, sticky="w", padx=5)
 
     # Row 1: Vectra FQDN
@@ -415,15 +590,30 @@ def main():
     )
     flatten_button.grid(row=4, column=0, columnspan=2, pady=10)
 
-    # Row 5: Status Label
+    # Row 5: Write edited tags back to Vectra
+    write_back_button = ttk.Button(
+        content,
+        text='Write Tags Back',
+        command=threaded_write_back,
+        bootstyle=WARNING
+    )
+    write_back_button.grid(row=5, column=0, columnspan=2, pady=10)
+
+    # Row 6: Status Label
     status_label = ttk.Label(content, text='Waiting for input...', foreground="black")
-    status_label.grid(row=5, column=0, columnspan=2, pady=10)
+    status_label.grid(row=6, column=0, columnspan=2, pady=10)
+
+    # Row 7: Progress bar + Cancel
+    progress = ProgressPanel(content, ui, row=7)
 
     # Info label (bottom-right corner) for GitHub link
     info = ttk.Label(root, text='?', cursor="hand2", foreground="blue", font=('Arial', 12, 'bold'))
     info.place(relx=1.0, rely=1.0, anchor='se', x=-10, y=-10)
     info.bind('<Button-1>', open_url)
 
+    # Hidden profiling toggle
+    root.bind('<Control-Shift-P>', toggle_profile)
+
     root.mainloop()
 
 
@@ -0,0 +1,100 @@
+"""
+Synthetic Vectra detection fixtures for benchmarks.
+
+Records mimic /api/v2.5/search/detections/ results: categories, types,
+threat/certainty, UTC timestamps, nested src_host/src_account, tags (with the
+static "true positive"/"false positive" values mixed in) and a grouped_details
+blob so payload sizes are realistic. Generation is deterministic: record i is
+always the same for a given seed, so pages can be built on demand without
+holding the whole dataset.
+"""
+
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+detection_types = {
+    "COMMAND & CONTROL": ["Hidden HTTPS Tunnel", "Suspicious Relay", "Multi-home Fronted Tunnel"],
+    "BOTNET ACTIVITY": ["Outbound DoS", "Cryptocurrency Mining", "Abnormal Ad Activity"],
+    "RECONNAISSANCE": ["Port Sweep", "Suspicious LDAP Query", "RPC Recon"],
+    "LATERAL MOVEMENT": ["Suspicious Remote Execution", "SMB Brute-Force", "Privilege Anomaly: Unusual Host"],
+    "EXFILTRATION": ["Data Smuggler", "Smash and Grab", "Hidden DNS Tunnel"],
+    "INFO": ["Novel MAC Vendor", "New Host"],
+}
+states = ["active", "inactive", "fixed"]
+BASE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _ts(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def make_detection(seed, i, tag_cardinality=50, hosts=2000, accounts=500):
+    """Detection record number i (1-based id)."""
+    rng = random.Random(seed * 1_000_003 + i)
+    category = rng.choice(list(detection_types))
+    created = BASE_TIME + timedelta(seconds=rng.randrange(0, 90 * 86400))
+    first = created - timedelta(seconds=rng.randrange(0, 3600))
+    last = created + timedelta(seconds=rng.randrange(0, 7 * 86400))
+    host_id = rng.randrange(1, hosts + 1)
+    ip = f"10.{host_id // 65536 % 256}.{host_id // 256 % 256}.{host_id % 256}"
+    tags = [f"tag-{rng.randrange(tag_cardinality)}" for _ in range(rng.choice((0, 0, 1, 1, 2, 3, 5)))]
+    if rng.random() < 0.2:
+        tags.append(rng.choice(["true positive", "false positive"]))
+    account = None
+    if rng.random() < 0.4:
+        acc_id = rng.randrange(1, accounts + 1)
+        account = {"id": acc_id, "name": f"svc-account-{acc_id}@corp.example",
+                   "url": f"https://brain.example/api/v2.5/accounts/{acc_id}"}
+    return {
+        "id": i,
+        "url": f"https://brain.example/api/v2.5/detections/{i}",
+        "category": category,
+        "detection_category": category,
+        "detection_type": rng.choice(detection_types[category]),
+        "state": rng.choice(states),
+        "threat": rng.randrange(0, 100),
+        "certainty": rng.randrange(0, 100),
+        "created_timestamp": _ts(created),
+        "first_timestamp": _ts(first),
+        "last_timestamp": _ts(last),
+        "src_ip": ip,
+        "src_host": {
+            "id": host_id, "ip": ip, "name": f"host-{host_id}.corp.example",
+            "is_key_asset": host_id % 50 == 0, "threat": rng.randrange(0, 100),
+            "certainty": rng.randrange(0, 100),
+            "url": f"https://brain.example/api/v2.5/hosts/{host_id}",
+        },
+        "src_account": account,
+        "tags": tags,
+        "targets_key_asset": rng.random() < 0.05,
+        "is_triaged": rng.random() < 0.3,
+        "custom_detection": None,
+        "triage_rule_id": None,
+        "filtered_by_ai": False,
+        "filtered_by_user": False,
+        "filtered_by_rule": False,
+        "grouped_details": [
+            {"dst_ips": [f"203.0.113.{rng.randrange(256)}"], "dst_ports": [rng.choice((443, 80, 53, 445))],
+             "bytes_sent": rng.randrange(10 ** 6), "bytes_received": rng.randrange(10 ** 6),
+             "first_timestamp": _ts(first), "last_timestamp": _ts(last)}
+            for _ in range(rng.randrange(1, 4))
+        ],
+    }
+
+
+def make_page(seed, count, page, page_size, **kw):
+    """Results for one page (1-based) of a count-record dataset."""
+    start = (page - 1) * page_size
+    return [make_detection(seed, i + 1, **kw) for i in range(start, min(start + page_size, count))]
+
+
+def write_export(path, count, seed=1, **kw):
+    """Write a saved-export style {"results": [...]} file, one record at a time."""
+    with open(path, "w") as f:
+        f.write('{"results": [')
+        for i in range(count):
+            f.write(",\n" if i else "\n")
+            json.dump(make_detection(seed, i + 1, **kw), f)
+        f.write("\n]}\n")
+    return path
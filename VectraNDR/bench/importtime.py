@@ -0,0 +1,133 @@
+"""
+Startup import budget for the exporter GUIs.
+
+Each exporter script is loaded (without opening its window) in a fresh
+`python -X importtime` process. The report shows the total import time,
+the slowest top-level imports, and any heavy modules that should only be
+imported once the user runs a query or flatten step
+(pandas/openpyxl/requests/ssl, see DEFERRED).
+
+Run from the VectraNDR folder:
+  python -m bench.importtime                      # all exporters
+  python -m bench.importtime --budget-ms 300 Vectra-Detection-First-Time-Exporter-API-2.5.py
+
+Scripts that build their window at import time (the legacy v1-v3
+exporters) are skipped by default. Exits non-zero if a script goes over
+--budget-ms, imports a DEFERRED module at startup, or fails to import.
+"""
+
+import os
+import sys
+import ast
+import json
+import glob
+import argparse
+import subprocess
+
+BUDGET_MS = 400
+TOP_N = 8
+
+# Imported on first query/flatten, never when the window opens
+DEFERRED = ["pandas", "numpy", "openpyxl", "requests", "urllib3", "ssl"]
+
+# Imports before MARKER (interpreter startup, the loader itself) are not counted
+MARKER = "-- exporter import starts --"
+_LOADER = f"""
+import sys, time, importlib.util
+sys.stderr.write({MARKER!r} + "\\n")
+sys.stderr.flush()
+t0 = time.perf_counter()
+spec = importlib.util.spec_from_file_location("exporter_under_test", sys.argv[1])
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+print(repr((time.perf_counter() - t0, sorted(sys.modules))))
+"""
+
+
+def default_targets():
+    """Exporter scripts that can be imported without opening their window."""
+    targets = []
+    for path in sorted(glob.glob("Vectra-Detection-*.py")):
+        with open(path, encoding="utf-8") as f:
+            if "if __name__ ==" in f.read():
+                targets.append(path)
+    return targets
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us, depth)] from -X importtime output."""
+    entries = []
+    lines = stderr.splitlines()
+    if MARKER in lines:
+        lines = lines[lines.index(MARKER) + 1:]
+    for line in lines:
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            entries.append((name.strip(), int(self_us), int(cum_us), depth))
+        except ValueError:
+            continue
+    return entries
+
+
+def measure(path):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _LOADER, path],
+                          capture_output=True, text=True)
+    entries = parse_importtime(proc.stderr)
+    result = {
+        "script": os.path.basename(path),
+        "import_ms": round(sum(cum for _, _, cum, depth in entries if depth == 0) / 1000, 1),
+        "top": [(name, round(cum / 1000, 1)) for name, _, cum, depth in
+                sorted(entries, key=lambda e: -e[2]) if depth == 0][:TOP_N],
+    }
+    if proc.returncode != 0:
+        result["error"] = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"
+        return result
+    seconds, modules = ast.literal_eval(proc.stdout.strip().splitlines()[-1])
+    result["load_ms"] = round(seconds * 1000, 1)
+    result["deferred_loaded"] = [m for m in DEFERRED if m in modules]
+    return result
+
+
+def check(result, budget_ms):
+    """List of budget violations for one script."""
+    problems = []
+    if "error" in result:
+        problems.append(f"import failed: {result['error']}")
+    if result["import_ms"] > budget_ms:
+        problems.append(f"{result['import_ms']:.0f} ms > {budget_ms} ms budget")
+    if result.get("deferred_loaded"):
+        problems.append("imports at startup: " + ", ".join(result["deferred_loaded"]))
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check exporter startup import time")
+    parser.add_argument("scripts", nargs="*", help="Exporter scripts (default: all Vectra-Detection-*.py)")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS,
+                        help="Max cumulative import time per script")
+    parser.add_argument("--out", help="Save results as JSON")
+    args = parser.parse_args(argv)
+
+    failed = False
+    results = []
+    for path in args.scripts or default_targets():
+        result = measure(path)
+        result["problems"] = check(result, args.budget_ms)
+        results.append(result)
+        failed = failed or bool(result["problems"])
+        status = "FAIL" if result["problems"] else "ok"
+        print(f"{status:<5}{result['script']}: imports {result['import_ms']:.0f} ms")
+        for name, ms in result["top"]:
+            print(f"       {ms:>8.1f} ms  {name}")
+        for problem in result["problems"]:
+            print(f"       ! {problem}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Local mock Vectra brain for benchmarks.
+
+Serves GET /api/v2.5/search/detections/ from bench.fixtures with "count",
+"next" and "previous" links like the real API. The query_string is accepted
+but not evaluated: every query returns the same synthetic dataset.
+
+Knobs:
+  count        records in the dataset
+  latency      seconds slept before each response (TTFB)
+  rate_limit   fraction of requests answered with 429 + Retry-After: 0
+
+Run standalone:  python -m bench.mockbrain --count 100000 --port 8443
+"""
+
+import random
+import argparse
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bench.fixtures import make_page
+from core import jsoncodec
+
+API_PATH = "/api/v2.5/search/detections/"
+
+
+class MockBrain:
+    def __init__(self, count=10000, latency=0.0, rate_limit=0.0, seed=1,
+                 port=0, host="127.0.0.1", **fixture_kw):
+        self.count = count
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.seed = seed
+        self.fixture_kw = fixture_kw
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        brain = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                brain.requests += 1
+                parts = urllib.parse.urlsplit(self.path)
+                if parts.path != API_PATH:
+                    self._send(404, {"detail": "Not found."})
+                    return
+                if brain.latency:
+                    time.sleep(brain.latency)
+                if brain.rate_limit and brain._rng.random() < brain.rate_limit:
+                    self._send(429, {"detail": "Request was throttled."}, {"Retry-After": "0"})
+                    return
+                params = urllib.parse.parse_qs(parts.query)
+                page = int(params.get("page", ["1"])[0])
+                page_size = int(params.get("page_size", ["5000"])[0])
+                results = make_page(brain.seed, brain.count, page, page_size, **brain.fixture_kw)
+                base = f"{brain.url}{API_PATH}?"
+                nxt = dict(params, page=[str(page + 1)])
+                prev = dict(params, page=[str(page - 1)])
+                self._send(200, {
+                    "count": brain.count,
+                    "next": base + urllib.parse.urlencode(nxt, doseq=True) if page * page_size < brain.count else None,
+                    "previous": base + urllib.parse.urlencode(prev, doseq=True) if page > 1 else None,
+                    "results": results,
+                })
+
+            def _send(self, status, payload, headers=None):
+                body = jsoncodec.dumpb(payload)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve synthetic Vectra detections locally")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of delay per request")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Fraction of requests answered 429")
+    parser.add_argument("--tag-cardinality", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8443)
+    args = parser.parse_args(argv)
+    brain = MockBrain(args.count, args.latency, args.rate_limit, port=args.port,
+                      tag_cardinality=args.tag_cardinality)
+    print(f"Mock brain on {brain.url}{API_PATH} ({args.count} detections); Ctrl+C to stop")
+    try:
+        brain._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
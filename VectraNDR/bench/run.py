@@ -0,0 +1,160 @@
+"""
+Benchmark the export stages against synthetic data and a local mock brain.
+
+Stages (each timed separately, with tracemalloc peak memory):
+  fetch     run_pipeline JSON-only against bench.mockbrain (needs requests)
+  parse     core.jsoncodec load of a saved export fixture (--json picks the backend)
+  flatten   flatten_json over every record
+  write     core.spill.SpillWriter -> xlsx (needs openpyxl)
+  pipeline  full fetch -> flatten -> xlsx run against the mock brain
+
+Run from the VectraNDR folder:
+  python -m bench.run --records 50000 --label my-branch --out bench-my-branch.json
+  python -m bench.run --records 50000 --compare bench-main.json
+
+--compare prints the change against a previous --out file, so results can be
+tracked across versions. Startup import time is checked separately by
+bench.importtime.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+from bench.fixtures import write_export
+from bench.mockbrain import MockBrain
+from core import jsoncodec
+from core.flatten import flatten_json, flatten_keys
+
+STAGES = ["fetch", "parse", "flatten", "write", "pipeline"]
+
+
+def measure(fn, trace=True):
+    """Run fn() -> records; return seconds, records and peak traced MB."""
+    if trace:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    try:
+        records = fn()
+    finally:
+        secs = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024) if trace else None
+        if trace:
+            tracemalloc.stop()
+    return secs, records, peak
+
+
+def run(args):
+    # Fixture, exports and xlsx can reach GBs at large --records; never leave them behind
+    with tempfile.TemporaryDirectory(prefix="vectra-bench-") as tmp:
+        return _run(args, tmp)
+
+
+def _run(args, tmp):
+    fixture_kw = {"tag_cardinality": args.tag_cardinality, "hosts": args.hosts}
+    export = write_export(os.path.join(tmp, "export.json"), args.records, **fixture_kw)
+    results = {"label": args.label, "records": args.records, "python": sys.version.split()[0],
+               "json_backend": jsoncodec.BACKEND, "stages": {}}
+    state = {}
+
+    def fetch():
+        from core.pipeline import run_pipeline
+        with MockBrain(args.records, args.latency, args.rate_limit, **fixture_kw) as brain:
+            return run_pipeline(brain.url, "bench", "bench", os.path.join(tmp, "fetch.json"))
+
+    def parse():
+        with open(export, "rb") as f:
+            state["data"] = jsoncodec.load(f)["results"]
+        return len(state["data"])
+
+    def flatten():
+        state["rows"] = [flatten_json(d, flatten_keys) for d in state["data"]]
+        return len(state["rows"])
+
+    def write():
+        from core.spill import SpillWriter
+        with SpillWriter(os.path.join(tmp, "write.xlsx")) as writer:
+            writer.write_many(state["rows"])
+        return writer.count
+
+    def pipeline():
+        from core.pipeline import run_pipeline
+        with MockBrain(args.records, args.latency, args.rate_limit, **fixture_kw) as brain:
+            return run_pipeline(brain.url, "bench", "bench", os.path.join(tmp, "pipe.json"),
+                                os.path.join(tmp, "pipe.xlsx"))
+
+    funcs = {"fetch": fetch, "parse": parse, "flatten": flatten, "write": write, "pipeline": pipeline}
+    for stage in args.stages:
+        if stage in ("flatten", "write") and "data" not in state:
+            parse()
+        if stage == "write" and "rows" not in state:
+            flatten()
+        try:
+            secs, records, peak = measure(funcs[stage], trace=not args.no_memory)
+        except ImportError as e:
+            results["stages"][stage] = {"skipped": str(e)}
+            continue
+        results["stages"][stage] = {
+            "seconds": round(secs, 4),
+            "records_per_s": round(records / secs) if secs > 0 else None,
+            "peak_mb": round(peak, 1) if peak is not None else None,
+        }
+    return results
+
+
+def report(results, baseline=None):
+    base = (baseline or {}).get("stages", {})
+    print(f"{results['label']}: {results['records']} records (Python {results['python']}, "
+          f"{results.get('json_backend', 'json')})")
+    print(f"{'stage':<10}{'seconds':>10}{'rec/s':>12}{'peak MB':>10}{'vs base':>10}")
+    for stage, r in results["stages"].items():
+        if "skipped" in r:
+            print(f"{stage:<10}  skipped: {r['skipped']}")
+            continue
+        delta = ""
+        prev = base.get(stage, {}).get("seconds")
+        if prev:
+            delta = f"{(r['seconds'] - prev) / prev * 100:+.0f}%"
+        peak = "-" if r["peak_mb"] is None else f"{r['peak_mb']:.1f}"
+        print(f"{stage:<10}{r['seconds']:>10.3f}{r['records_per_s'] or 0:>12}{peak:>10}{delta:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Vectra exporter stages")
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--tag-cardinality", type=int, default=50)
+    parser.add_argument("--hosts", type=int, default=2000, help="Distinct src_host ids")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mock brain delay per request (s)")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Fraction of mock requests answered 429")
+    parser.add_argument("--stage", action="append", dest="stages", choices=STAGES,
+                        help="Stage to run (repeatable; default: all)")
+    parser.add_argument("--json", choices=["json", "orjson"], help="JSON backend (default: orjson if installed)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc (faster, no peak MB)")
+    parser.add_argument("--label", default="current")
+    parser.add_argument("--out", help="Save results as JSON")
+    parser.add_argument("--compare", help="Previous --out file to compare against")
+    args = parser.parse_args(argv)
+    args.stages = args.stages or STAGES
+    if args.json:
+        try:
+            jsoncodec.set_backend(args.json)
+        except ImportError as e:
+            parser.error(str(e))
+
+    results = run(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Makes pytest put this folder on sys.path, so tests import core.* from any working directory
@@ -0,0 +1,100 @@
+"""
+Compact in-memory storage for repeated categorical values.
+
+A parsed export holds a separate str object for every occurrence of values
+that only take a handful of distinct forms (detection_category,
+detection_type, state, tag values, host and account names). Two ways of
+sharing them:
+
+  Interner        one shared copy of each distinct value; record() applies
+                  it in place to the CATEGORICAL fields of a parsed record
+  CategoryColumn  dictionary-encoded column: each distinct value stored
+                  once plus an array of small integer codes, so filters
+                  test a value once per distinct value rather than once
+                  per row, and sorting ranks the distinct values only
+
+core.preview stores its columns as CategoryColumns; core.localquery interns
+records as it loads them.
+"""
+
+from array import array
+
+# Dotted paths; list values (tags) have each element interned
+CATEGORICAL = [
+    "category", "detection_category", "detection_type", "state", "tags", "src_ip",
+    "src_host.name", "src_host.ip", "src_account.name",
+]
+
+
+class Interner:
+    def __init__(self, paths=CATEGORICAL):
+        self.paths = [p.split(".") for p in paths]
+        self._pool = {}
+
+    def __call__(self, value):
+        return self._pool.setdefault(value, value)
+
+    def __len__(self):
+        return len(self._pool)
+
+    def record(self, rec):
+        """Replace the values at self.paths with their shared copies; returns rec."""
+        for *parents, leaf in self.paths:
+            obj = rec
+            for part in parents:
+                obj = obj.get(part) if isinstance(obj, dict) else None
+            if not isinstance(obj, dict):
+                continue
+            value = obj.get(leaf)
+            if isinstance(value, str):
+                obj[leaf] = self(value)
+            elif isinstance(value, list):
+                obj[leaf] = [self(v) if isinstance(v, str) else v for v in value]
+        return rec
+
+
+class CategoryColumn:
+    """Sequence of values stored as codes into a list of distinct values."""
+
+    def __init__(self, values=()):
+        self.values = []  # code -> value
+        self._code = {}   # value -> code
+        self.codes = array("H")
+        for v in values:
+            self.append(v)
+
+    def append(self, value):
+        code = self._code.get(value)
+        if code is None:
+            code = self._code[value] = len(self.values)
+            self.values.append(value)
+            if code > 0xFFFF and self.codes.typecode == "H":
+                self.codes = array("I", self.codes)
+        self.codes.append(code)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        return self.values[self.codes[i]]
+
+    def __iter__(self):
+        values = self.values
+        return (values[c] for c in self.codes)
+
+    def where(self, ok, rows):
+        """The rows whose value passes ok(value); ok is called once per distinct value."""
+        hits = {c for c, v in enumerate(self.values) if ok(v)}
+        codes = self.codes
+        if len(hits) == 1:
+            (hit,) = hits
+            return [i for i in rows if codes[i] == hit]
+        return [i for i in rows if codes[i] in hits]
+
+    def ranks(self, key):
+        """code -> position of its value in key order, for sorting rows by code."""
+        order = sorted(range(len(self.values)), key=lambda c: key(self.values[c]))
+        ranks = [0] * len(order)
+        for pos, code in enumerate(order):
+            ranks[code] = pos
+        return ranks
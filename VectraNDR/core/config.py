@@ -0,0 +1,37 @@
+"""
+Settings shared by all Vectra exporters, stored as JSON in
+~/.kaizenkit/vectra.json (override the path with $KAIZENKIT_CONFIG).
+
+Example:
+  {"timezone": "Asia/Kuala_Lumpur"}
+"""
+
+import os
+import json
+
+CONFIG_PATH = os.environ.get(
+    "KAIZENKIT_CONFIG",
+    os.path.join(os.path.expanduser("~"), ".kaizenkit", "vectra.json")
+)
+
+
+def load_config():
+    """Return the saved settings, or {} if the file is missing or unreadable."""
+    try:
+        with open(CONFIG_PATH) as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_config(**updates):
+    """Merge updates into the saved settings."""
+    data = load_config()
+    data.update(updates)
+    os.makedirs(os.path.dirname(CONFIG_PATH), exist_ok=True)
+    tmp = CONFIG_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, CONFIG_PATH)
+    return data
@@ -0,0 +1,239 @@
+"""
+Date-partitioned on-disk dataset of detections.
+
+Instead of one overlapping detections_<start>_<end>.json per export, records
+are kept under one root, partitioned by the UTC day of a timestamp field:
+
+  <root>/first_timestamp=2024-01-01/part-<ns>.jsonl.zst
+  <root>/first_timestamp=2024-01-02/part-<ns>.jsonl.zst
+  <root>/dataset.json          (the partition field)
+
+Every write adds one part file per day it touches (JSON Lines, zstd when the
+zstandard package is installed, gzip otherwise), so adding an export never
+rewrites history. Reads upsert by detection id within a partition: the
+version with the newest last_timestamp wins, later parts break ties, so
+re-adding an older export never undoes newer state. compact() merges each
+partition's parts into one file holding only the winning versions.
+scan(start, end) opens only the partitions in the requested days.
+
+Partition on a field that doesn't change for a detection (first_timestamp,
+created_timestamp) so every version of it lands in the same partition.
+
+From the VectraNDR folder:
+  python -m core.dataset add ~/vectra-data detections_*.json
+  python -m core.dataset compact ~/vectra-data
+  python -m core.dataset scan ~/vectra-data --start 2024-01-01 --end 2024-01-07 --out week.jsonl
+  python -m core.dataset info ~/vectra-data
+"""
+
+import os
+import gzip
+import json
+import time
+import argparse
+
+from core.jsonstream import iter_results
+from core import jsoncodec
+
+DEFAULT_FIELD = "first_timestamp"
+META = "dataset.json"
+UNKNOWN = "unknown"
+
+try:
+    import zstandard
+    EXT = ".jsonl.zst"
+except ImportError:
+    zstandard = None
+    EXT = ".jsonl.gz"
+
+
+def _open_write(path):
+    if path.endswith(".zst"):
+        return zstandard.open(path, "wt", encoding="utf-8")
+    return gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+
+
+def _open_read(path):
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{path}: install zstandard to read .zst partitions")
+        return zstandard.open(path, "rt", encoding="utf-8")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def day_of(value):
+    """"2024-01-01T12:34:56Z" -> "2024-01-01" (API timestamps are UTC)."""
+    text = str(value or "")
+    return text[:10] if len(text) >= 10 and text[4] == "-" and text[7] == "-" else UNKNOWN
+
+
+def _newer(a, b):
+    """True if record a should replace b (same id)."""
+    return str(a.get("last_timestamp") or "") >= str(b.get("last_timestamp") or "")
+
+
+class Dataset:
+    """
+    An existing dataset, or with create=True one that may not exist yet: its
+    root and dataset.json are then made by the first write(), so reading a
+    mistyped path fails instead of leaving an empty dataset behind.
+    """
+
+    def __init__(self, root, field=None, create=False):
+        self.root = os.path.expanduser(root)
+        self._meta_path = os.path.join(self.root, META)
+        saved = None
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                saved = json.load(f).get("field")
+        elif not create:
+            raise FileNotFoundError(f"{self.root} is not a dataset (no {META}); create it with 'add'")
+        if saved and field and field != saved:
+            raise ValueError(f"{self.root} is partitioned by {saved}, not {field}")
+        self.field = saved or field or DEFAULT_FIELD
+        self._saved = bool(saved)
+
+    def _save_meta(self):
+        if not self._saved:
+            os.makedirs(self.root, exist_ok=True)
+            with open(self._meta_path, "w") as f:
+                json.dump({"field": self.field}, f)
+            self._saved = True
+
+    def _dir(self, day):
+        return os.path.join(self.root, f"{self.field}={day}")
+
+    def partitions(self, start=None, end=None):
+        """Sorted partition days, optionally limited to start..end (YYYY-MM-DD, inclusive)."""
+        prefix = f"{self.field}="
+        days = sorted(name[len(prefix):] for name in os.listdir(self.root)
+                      if name.startswith(prefix) and os.path.isdir(os.path.join(self.root, name)))
+        if start or end:
+            days = [d for d in days if d != UNKNOWN
+                    and (not start or d >= start) and (not end or d <= end)]
+        return days
+
+    def parts(self, day):
+        folder = self._dir(day)
+        return [os.path.join(folder, n) for n in sorted(os.listdir(folder))
+                if n.startswith("part-") and not n.endswith(".tmp")]
+
+    def _new_part(self, day):
+        folder = self._dir(day)
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, f"part-{time.time_ns():020d}{EXT}")
+
+    def write(self, records):
+        """Append records (any iterable) as new parts; returns {day: count}."""
+        self._save_meta()
+        files, counts = {}, {}
+        try:
+            for rec in records:
+                day = day_of(rec.get(self.field))
+                if day not in files:
+                    path = self._new_part(day)
+                    files[day] = (path, _open_write(path + ".tmp"))
+                f = files[day][1]
+                f.write(jsoncodec.dumps(rec))
+                f.write("\n")
+                counts[day] = counts.get(day, 0) + 1
+        except BaseException:
+            for path, f in files.values():
+                f.close()
+                os.remove(path + ".tmp")
+            raise
+        # Parts only become visible once complete
+        for path, f in files.values():
+            f.close()
+            os.replace(path + ".tmp", path)
+        return counts
+
+    def read_partition(self, day):
+        """Upserted records of one day: {id: record}."""
+        latest = {}
+        for path in self.parts(day):
+            with _open_read(path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    rec = jsoncodec.loads(line)
+                    key = rec.get("id")
+                    old = latest.get(key)
+                    if old is None or _newer(rec, old):
+                        latest[key] = rec
+        return latest
+
+    def scan(self, start=None, end=None):
+        for day in self.partitions(start, end):
+            yield from self.read_partition(day).values()
+
+    def compact(self, min_parts=2):
+        """Merge partitions with at least min_parts parts; returns {day: (parts before, records)}."""
+        done = {}
+        for day in self.partitions():
+            parts = self.parts(day)
+            if len(parts) < min_parts:
+                continue
+            records = self.read_partition(day)
+            target = self._new_part(day)
+            with _open_write(target + ".tmp") as f:
+                for rec in records.values():
+                    f.write(jsoncodec.dumps(rec))
+                    f.write("\n")
+            os.replace(target + ".tmp", target)
+            for path in parts:
+                os.remove(path)
+            done[day] = (len(parts), len(records))
+        return done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Date-partitioned detection dataset")
+    sub = parser.add_subparsers(dest="command", required=True)
+    add = sub.add_parser("add", help="Add saved exports (.json/.jsonl) to the dataset")
+    add.add_argument("root")
+    add.add_argument("files", nargs="+")
+    add.add_argument("--field", help=f"Timestamp field to partition by (new datasets; default {DEFAULT_FIELD})")
+    compact = sub.add_parser("compact", help="Merge each partition's parts into one file")
+    compact.add_argument("root")
+    compact.add_argument("--min-parts", type=int, default=2)
+    scan = sub.add_parser("scan", help="Write the upserted records of a day range as JSON Lines")
+    scan.add_argument("root")
+    scan.add_argument("--start", help="First day, YYYY-MM-DD (UTC)")
+    scan.add_argument("--end", help="Last day, YYYY-MM-DD (UTC)")
+    scan.add_argument("--out", required=True, help=".jsonl output (readable by core.localquery)")
+    info = sub.add_parser("info", help="Partitions and part counts")
+    info.add_argument("root")
+    args = parser.parse_args(argv)
+
+    try:
+        ds = Dataset(args.root, getattr(args, "field", None), create=args.command == "add")
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if args.command == "add":
+        for path in args.files:
+            counts = ds.write(iter_results(path))
+            print(f"{path}: {sum(counts.values())} records into {len(counts)} partitions")
+    elif args.command == "compact":
+        for day, (parts, n) in ds.compact(args.min_parts).items():
+            print(f"  {day}: {parts} parts -> 1 ({n} records)")
+    elif args.command == "scan":
+        n = 0
+        with open(args.out, "w", encoding="utf-8") as f:
+            for rec in ds.scan(args.start, args.end):
+                f.write(jsoncodec.dumps(rec))
+                f.write("\n")
+                n += 1
+        print(f"{n} records saved to: {args.out}")
+    else:
+        print(f"{ds.root} (partitioned by {ds.field})")
+        for day in ds.partitions():
+            parts = ds.parts(day)
+            size = sum(os.path.getsize(p) for p in parts)
+            print(f"  {day}: {len(parts)} parts, {size / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
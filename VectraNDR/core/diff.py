@@ -0,0 +1,155 @@
+"""
+Delta report between two saved exports (e.g. yesterday's and today's).
+
+Detections are joined on id through a hash index: the old export is read
+once into {id: hash of the compared fields}, the new export is streamed
+against it, and the old export is streamed a second time only to pick up
+the previous values of detections that changed or disappeared. Both files
+go through core.jsonstream, so memory grows with the number of ids (one
+int per id), not with record size.
+
+Compared fields: state, tags (order ignored), threat, certainty and the
+triage fields; add more with --field. The report is a CSV with one row per
+added/removed detection and one per changed field.
+
+From the VectraNDR folder:
+  python -m core.diff detections_old.json detections_new.json [--out delta.csv]
+"""
+
+import os
+import csv
+import json
+import argparse
+from collections import Counter
+
+from core.jsonstream import iter_results
+from core.localquery import get_value, range_key
+
+DIFF_FIELDS = [
+    "state", "tags", "threat", "certainty", "is_triaged", "triage_rule_id",
+    "filtered_by_ai", "filtered_by_user", "filtered_by_rule",
+]
+# Shown on every report row so a change can be read without the exports
+CONTEXT_FIELDS = ["detection_type", "src_host.name"]
+
+ADDED = "added"
+REMOVED = "removed"
+CHANGED = "changed"
+
+
+def _value(record, field):
+    """The field as a hashable value: lists as tuples, objects as canonical JSON."""
+    v = get_value(record, field)
+    if isinstance(v, list):
+        return tuple(sorted(map(str, v))) if field == "tags" else tuple(map(str, v))
+    if isinstance(v, dict):
+        return json.dumps(v, sort_keys=True, default=str)
+    return v
+
+
+def fingerprint(record, fields):
+    return tuple(_value(record, f) for f in fields)
+
+
+class DiffResult:
+    def __init__(self, fields):
+        self.fields = fields
+        self.old_count = 0
+        self.new_count = 0
+        self.added = []    # new records' context rows
+        self.removed = []  # old records' context rows
+        self.changed = {}  # id -> (old fingerprint, new fingerprint, context)
+
+    def field_counts(self):
+        counts = Counter()
+        for old, new, _ in self.changed.values():
+            for f, a, b in zip(self.fields, old, new):
+                if a != b:
+                    counts[f] += 1
+        return counts
+
+    def rows(self):
+        """(change, id, field, old, new, *context) report rows, sorted by id."""
+        out = []
+        for ctx in self.added:
+            out.append((ADDED, ctx[0], "", "", "") + ctx[1:])
+        for ctx in self.removed:
+            out.append((REMOVED, ctx[0], "", "", "") + ctx[1:])
+        for det_id, (old, new, ctx) in self.changed.items():
+            for f, a, b in zip(self.fields, old, new):
+                if a != b:
+                    out.append((CHANGED, det_id, f, _text(a), _text(b)) + ctx)
+        out.sort(key=lambda r: (range_key(r[1]), r[0], r[2]))
+        return out
+
+
+def _text(v):
+    if isinstance(v, tuple):
+        return "; ".join(v)
+    return "" if v is None else v
+
+
+def _context(record):
+    return (record.get("id"),) + tuple(_text(_value(record, f)) for f in CONTEXT_FIELDS)
+
+
+def diff_exports(old_path, new_path, fields=DIFF_FIELDS):
+    result = DiffResult(list(fields))
+    index = {}
+    for rec in iter_results(old_path):
+        result.old_count += 1
+        index[rec.get("id")] = hash(fingerprint(rec, fields))
+
+    new_fps = {}
+    for rec in iter_results(new_path):
+        result.new_count += 1
+        det_id = rec.get("id")
+        fp = fingerprint(rec, fields)
+        old_hash = index.pop(det_id, None)
+        if old_hash is None:
+            result.added.append(_context(rec))
+        elif old_hash != hash(fp):
+            new_fps[det_id] = (fp, _context(rec)[1:])
+
+    # Whatever is left in the index is gone from the new export
+    removed = index
+    if new_fps or removed:
+        for rec in iter_results(old_path):
+            det_id = rec.get("id")
+            if det_id in new_fps:
+                fp, ctx = new_fps.pop(det_id)
+                result.changed[det_id] = (fingerprint(rec, fields), fp, ctx)
+            elif det_id in removed:
+                del removed[det_id]
+                result.removed.append(_context(rec))
+    return result
+
+
+def write_report(path, result):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["change", "id", "field", "old", "new"] + CONTEXT_FIELDS)
+        w.writerows(result.rows())
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Added/removed/changed detections between two saved exports")
+    parser.add_argument("old", help="Earlier export (.json or .jsonl)")
+    parser.add_argument("new", help="Later export (.json or .jsonl)")
+    parser.add_argument("--field", action="append", default=[], help="Extra field to compare (repeatable)")
+    parser.add_argument("--out", help="CSV report (default: <new>.diff.csv)")
+    args = parser.parse_args(argv)
+
+    fields = DIFF_FIELDS + [f for f in args.field if f not in DIFF_FIELDS]
+    result = diff_exports(args.old, args.new, fields)
+    print(f"{result.old_count} -> {result.new_count} detections: {len(result.added)} added, "
+          f"{len(result.removed)} removed, {len(result.changed)} changed")
+    for field, n in result.field_counts().most_common():
+        print(f"  {n:>8}  {field}")
+    out = args.out or os.path.splitext(args.new)[0] + ".diff.csv"
+    print(f"Report: {write_report(out, result)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Host and account enrichment for exported detections.
+
+Detections only carry src_host.id/name/ip and src_account.id/name. Enricher
+collects the distinct host and account ids of a batch of records, looks
+them up once each and adds src_host_info / src_account_info dicts that
+flatten into the enrich_keys columns (key-asset flag, groups, last
+detection, threat/certainty, ...).
+
+Lookups never go one per detection:
+  - ids already seen in this run come from memory
+  - then from a local SQLite cache (entities.sqlite next to the settings
+    file), valid for "entity_cache_ttl_hours" (default 24)
+  - the rest are fetched from /api/v2.5/search/hosts/ and /search/accounts/
+    with core.idpack range/grouped id queries, a few queries at a time over
+    one connection pool
+Ids the brain doesn't return are cached as empty, so they aren't re-asked.
+
+From the VectraNDR folder:
+  python -m core.enrich detections_X.json --server brain.example   (writes detections_X.enriched.json)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from core.config import CONFIG_PATH, load_config
+from core import jsoncodec
+from core.idpack import pack_ids
+from core.jsonstream import iter_results
+from core.pipeline import Cancelled, build_url, iter_pages, open_session
+
+HOST_FIELDS = ["is_key_asset", "groups", "last_detection_timestamp", "threat", "certainty", "state"]
+ACCOUNT_FIELDS = ["privilege_level", "privilege_category", "last_detection_timestamp",
+                  "threat", "certainty", "state"]
+
+# kind -> (detection field, info field, search path, id field in queries, fields kept)
+KINDS = {
+    "host": ("src_host", "src_host_info", "/api/v2.5/search/hosts/", "host.id", HOST_FIELDS),
+    "account": ("src_account", "src_account_info", "/api/v2.5/search/accounts/", "account.id",
+                ACCOUNT_FIELDS),
+}
+enrich_keys = ([f"src_host_info.{f}" for f in HOST_FIELDS]
+               + [f"src_account_info.{f}" for f in ACCOUNT_FIELDS])
+
+CACHE_PATH = os.path.join(os.path.dirname(CONFIG_PATH), "entities.sqlite")
+DEFAULT_TTL_HOURS = 24
+DEFAULT_WORKERS = 4
+# Entity search results are small; leave URL room for the page/next parameters
+QUERY_BUDGET = 4000
+
+
+def load_ttl():
+    try:
+        return float(load_config().get("entity_cache_ttl_hours", DEFAULT_TTL_HOURS)) * 3600
+    except (TypeError, ValueError):
+        return DEFAULT_TTL_HOURS * 3600
+
+
+def pick(entity, fields):
+    info = {}
+    for f in fields:
+        v = entity.get(f)
+        if f == "groups" and isinstance(v, list):
+            v = [g.get("name") if isinstance(g, dict) else g for g in v]
+        info[f] = v
+    return info
+
+
+class EntityCache:
+    """(server, kind, id) -> info dict with a fetch time; safe to share across threads."""
+
+    def __init__(self, path=CACHE_PATH, ttl=None):
+        self.path = path
+        self.ttl = load_ttl() if ttl is None else ttl
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS entities (server TEXT, kind TEXT, id INTEGER,"
+                               " data TEXT, fetched REAL, PRIMARY KEY (server, kind, id))")
+        return self._conn
+
+    def get_many(self, server, kind, ids):
+        """{id: info} for ids cached within the TTL."""
+        found, oldest = {}, time.time() - self.ttl
+        ids = list(ids)
+        with self._lock:
+            db = self._db()
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = db.execute(f"SELECT id, data FROM entities WHERE server=? AND kind=? AND fetched>=?"
+                                  f" AND id IN ({marks})", [server, kind, oldest] + chunk)
+                for det_id, data in rows:
+                    found[det_id] = json.loads(data)
+        return found
+
+    def put_many(self, server, kind, infos):
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.executemany("INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?, ?)",
+                           [(server, kind, i, json.dumps(info), now) for i, info in infos.items()])
+            db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class Enricher:
+    def __init__(self, server, token, cache=None, workers=DEFAULT_WORKERS, metrics=None, cancel=None):
+        self.server = server
+        self.token = token
+        self.cache = cache or EntityCache()
+        self.workers = workers
+        self.metrics = metrics
+        self.cancel = cancel
+        self._memo = {kind: {} for kind in KINDS}
+        self._sess = None
+
+    def _fetch(self, kind, ids):
+        _, _, path, id_field, fields = KINDS[kind]
+        queries = pack_ids(ids, QUERY_BUDGET, id_field)
+        if self._sess is None:
+            self._sess = open_session(self.workers)
+
+        def run(query):
+            out = {}
+            url = build_url(self.server, query, path=path)
+            for page in iter_pages(self._sess, url, self.token, self.metrics, self.cancel):
+                for entity in page:
+                    out[entity.get("id")] = pick(entity, fields)
+            return out
+
+        found = {}
+        with ThreadPoolExecutor(min(self.workers, len(queries)) or 1) as pool:
+            for part in pool.map(run, queries):
+                found.update(part)
+        if self.metrics:
+            self.metrics.count(f"{kind}_lookups", len(queries))
+        return found
+
+    def lookup(self, kind, ids):
+        """Make sure every id is in the in-memory table; returns it."""
+        memo = self._memo[kind]
+        missing = {i for i in ids if i not in memo}
+        if missing:
+            cached = self.cache.get_many(self.server, kind, missing)
+            memo.update(cached)
+            missing -= cached.keys()
+        if missing:
+            if self.cancel is not None and self.cancel.is_set():
+                raise Cancelled()
+            fetched = self._fetch(kind, sorted(missing))
+            # Unknown ids are cached as empty so they aren't asked for again
+            fresh = {i: fetched.get(i, {}) for i in missing}
+            self.cache.put_many(self.server, kind, fresh)
+            memo.update(fresh)
+        return memo
+
+    def enrich(self, records):
+        """Add src_host_info / src_account_info to each record in place."""
+        for kind, (src, info_key, *_rest) in KINDS.items():
+            ids = {r[src].get("id") for r in records if isinstance(r.get(src), dict)}
+            ids = {i for i in ids if isinstance(i, int)}
+            memo = self.lookup(kind, ids) if ids else self._memo[kind]
+            for r in records:
+                ent = r.get(src)
+                r[info_key] = memo.get(ent.get("id"), {}) if isinstance(ent, dict) else {}
+        return records
+
+    def close(self):
+        if self._sess is not None:
+            self._sess.close()
+            self._sess = None
+        self.cache.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Add host/account details to a saved export")
+    parser.add_argument("export", help="Saved export (.json or .jsonl)")
+    parser.add_argument("--server", required=True, help="Vectra Brain FQDN")
+    parser.add_argument("--token", default=os.environ.get("VECTRA_TOKEN"),
+                        help="API token (default: $VECTRA_TOKEN)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent lookups")
+    parser.add_argument("--out", help="Output (default: <export>.enriched.json)")
+    args = parser.parse_args(argv)
+
+    if not args.token:
+        parser.error("--token or $VECTRA_TOKEN is required")
+    records = list(iter_results(args.export))
+    enricher = Enricher(args.server, args.token, workers=args.workers)
+    try:
+        enricher.enrich(records)
+    finally:
+        enricher.close()
+    out = args.out or os.path.splitext(args.export)[0] + ".enriched.json"
+    with open(out, "wb") as f:
+        jsoncodec.dump({"results": records}, f)
+    hosts, accounts = (len(enricher._memo[k]) for k in ("host", "account"))
+    print(f"{len(records)} detections enriched ({hosts} hosts, {accounts} accounts): {out}")
+
+
+if __name__ == "__main__":
+    main()
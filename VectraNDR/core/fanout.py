@@ -0,0 +1,204 @@
+"""
+Multi-brain fan-out export.
+
+Runs the same query against several Vectra brains in parallel and writes
+one merged JSON/xlsx. Every record gets a "source_brain" field (the brain's
+name) and records are deduplicated by (source_brain, id), since detection
+ids are only unique within a brain. The merge goes through
+core.pipeline.run_pipeline, so flattening, spilling, progress, metrics and
+cancel behave as for a single brain.
+
+Brains file (JSON), either a list or {"brains": [...]}:
+  [
+    {"name": "kl-dc", "server": "brain1.example", "token": "XXX"},
+    {"server": "brain2.example", "token_env": "VECTRA_TOKEN_B2"}
+  ]
+name defaults to the server; token_env reads the token from the environment.
+
+Headless, from the VectraNDR folder:
+  python -m core.fanout --brains brains.json \\
+      --start "2024-01-01 00:00" --end "2024-01-02 00:00" --field first
+"""
+
+import os
+import json
+import queue
+import argparse
+import threading
+
+from core.flatten import flatten_keys
+from core.tz import load_display_tz, local_to_utc
+from core.metrics import RunMetrics, publish
+from core.summary import Summary
+from core.pipeline import (
+    QUEUE_DEPTH, Cancelled, PipelineError, build_url, categories, build_query, iter_pages,
+    open_session, output_path, run_pipeline, time_field_sets, _get, _put, _window, _DONE,
+)
+
+fanout_keys = ["source_brain"] + flatten_keys
+
+
+def load_brains(path):
+    """[{"name", "server", "token"}, ...] from a brains file; ValueError if unusable."""
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("brains")
+    if not isinstance(data, list) or not data:
+        raise ValueError(f"{path}: expected a non-empty list of brains")
+    brains, names = [], set()
+    for i, entry in enumerate(data, 1):
+        server = str(entry.get("server", "")).strip() if isinstance(entry, dict) else ""
+        if not server:
+            raise ValueError(f"{path}: brain {i} has no server")
+        token = entry.get("token") or os.environ.get(entry.get("token_env", ""), "")
+        if not token:
+            raise ValueError(f"{path}: no token for {server}")
+        name = str(entry.get("name") or server)
+        if name in names:
+            raise ValueError(f"{path}: duplicate brain name {name}")
+        names.add(name)
+        brains.append({"name": name, "server": server, "token": token})
+    return brains
+
+
+class FanOut:
+    """
+    Iterable of merged result pages from several brains fetched in parallel.
+    total is the sum of the brains' reported counts once all have answered;
+    counts holds records yielded per brain.
+    """
+
+    def __init__(self, brains, query, metrics=None, cancel=None):
+        self.brains = brains
+        self.query = query
+        self.metrics = metrics
+        self.cancel = cancel
+        self.total = None
+        self.counts = {b["name"]: 0 for b in brains}
+        self._reported = {}
+
+    def _on_count(self, name, n):
+        self._reported[name] = n
+        if len(self._reported) == len(self.brains):
+            self.total = sum(self._reported.values())
+
+    def _fetch(self, brain, out_q, stop):
+        name = brain["name"]
+        try:
+            if self.metrics and "://" not in brain["server"]:
+                self.metrics.probe(brain["server"])
+            with open_session() as sess:
+                url = build_url(brain["server"], self.query)
+                pages = iter_pages(sess, url, brain["token"], self.metrics, self.cancel,
+                                   on_count=lambda n: self._on_count(name, n))
+                for page in pages:
+                    if not _put(out_q, (name, page), stop):
+                        return
+        except Exception as e:
+            _put(out_q, (name, e), stop)
+        finally:
+            _put(out_q, (name, _DONE), stop)
+
+    def __iter__(self):
+        out_q = queue.Queue(maxsize=QUEUE_DEPTH * len(self.brains))
+        stop = threading.Event()
+        threads = [threading.Thread(target=self._fetch, args=(b, out_q, stop), daemon=True)
+                   for b in self.brains]
+        for t in threads:
+            t.start()
+        seen = set()
+        running = len(threads)
+        try:
+            while running:
+                name, page = _get(out_q, stop)
+                if page is _DONE:
+                    running -= 1
+                    continue
+                if isinstance(page, Cancelled):
+                    raise page
+                if isinstance(page, Exception):
+                    raise PipelineError(f"{name}: {page}") from page
+                merged = []
+                for d in page:
+                    key = (name, d.get("id"))
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    d["source_brain"] = name
+                    merged.append(d)
+                self.counts[name] += len(merged)
+                if merged:
+                    yield merged
+        finally:
+            stop.set()
+            for t in threads:
+                t.join(timeout=5)
+
+
+def run_fanout(brains, query, json_path, xlsx_path=None, on_progress=None, tz=None,
+               metrics=None, cancel=None, summary=None):
+    """run_pipeline over every brain; returns (records written, FanOut)."""
+    pages = FanOut(brains, query, metrics, cancel)
+    count = run_pipeline(None, None, query, json_path, xlsx_path, keys=fanout_keys,
+                         on_progress=on_progress, tz=tz, metrics=metrics, cancel=cancel,
+                         pages=pages, summary=summary)
+    return count, pages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export one query from several Vectra brains into one file")
+    parser.add_argument("--brains", required=True, help="Brains file (JSON list of server/token)")
+    parser.add_argument("--start", help="Start time, YYYY-MM-DD HH:MM (in --tz)")
+    parser.add_argument("--end", help="End time, YYYY-MM-DD HH:MM (in --tz)")
+    parser.add_argument("--since-minutes", type=int, help="Instead of --start/--end, export the last N minutes")
+    parser.add_argument("--field", choices=sorted(time_field_sets), default="first",
+                        help="Timestamp field(s) the window applies to")
+    parser.add_argument("--category", action="append", dest="categories",
+                        help="Detection category to include (repeatable; default: GUI defaults)")
+    parser.add_argument("--exclude-type", action="append", dest="exclude_types", default=[],
+                        help="detection_type to exclude (repeatable)")
+    parser.add_argument("--tz", default=None,
+                        help="Timezone of --start/--end and local timestamps (default: saved setting)")
+    parser.add_argument("--local-timestamps", action="store_true",
+                        help="Write Excel timestamps as --tz datetimes instead of UTC strings")
+    parser.add_argument("--no-excel", action="store_true", help="Only save the JSON")
+    parser.add_argument("--summary", action="store_true",
+                        help="Also write category/type/tag/host/threat summaries (xlsx sheets + .summary.json)")
+    parser.add_argument("-v", "-verbose", "--verbose", action="store_true", dest="verbose",
+                        help="Print the per-stage timing breakdown")
+    args = parser.parse_args(argv)
+
+    if not args.since_minutes and not (args.start and args.end):
+        parser.error("--start and --end (or --since-minutes) are required")
+    try:
+        brains = load_brains(args.brains)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    tz_name = args.tz or load_display_tz()
+    start, end = _window(args, tz_name)
+    try:
+        st_utc, et_utc = local_to_utc(start, tz_name), local_to_utc(end, tz_name)
+    except ValueError as e:
+        parser.error(str(e))
+
+    selected = args.categories or [val for _, val, dflt in categories if dflt]
+    query = build_query(selected, time_field_sets[args.field], st_utc, et_utc, args.exclude_types)
+    json_path = output_path(start, end, "merged")
+    xlsx_path = None if args.no_excel else json_path.replace(".json", ".xlsx")
+    metrics = RunMetrics(f"fanout:{args.field}")
+    try:
+        count, fan = run_fanout(brains, query, json_path, xlsx_path,
+                                tz=tz_name if args.local_timestamps else None, metrics=metrics,
+                                summary=Summary() if args.summary else None)
+        for name, n in fan.counts.items():
+            print(f"  {name}: {n}")
+        print(f"{count} detections from {len(brains)} brains saved to: {json_path}")
+        if xlsx_path:
+            print(f"Excel saved: {xlsx_path}")
+    finally:
+        print(publish(metrics, json_path, args.verbose))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Detection flattening shared by the Vectra exporters.
+
+Turns nested detection records from /api/v2.5/search/detections/ into flat
+rows with one column per key in flatten_keys. Keys in special_expand_keys
+(e.g. tags) are kept as sorted_<key> lists (dynamic values first, static
+values from special_static_values last) and laid out into fixed
+"<key>_1..<key>_N" columns by core.spill.
+"""
+
+# Expansion settings
+special_expand_keys = ["tags"]
+special_static_values = {"tags": {"false positive", "true positive", ""}}
+expand_arrays = []
+
+flatten_keys = [
+    "id", "state", "threat", "certainty", "detection_category",
+    "detection_type", "created_timestamp", "first_timestamp",
+    "last_timestamp", "src_ip", "src_host.id", "src_host.ip",
+    "src_host.name", "src_account.id", "src_account.name",
+    "src_host.is_key_asset", "targets_key_asset", "is_triaged",
+    "custom_detection", "triage_rule_id", "filtered_by_ai",
+    "filtered_by_user", "filtered_by_rule"
+] + special_expand_keys
+
+
+def split_special(key, values):
+    """Split a special key's values into (dynamic, static) lists."""
+    static_vals = special_static_values.get(key, set())
+    dynamic, static = [], []
+    for v in values:
+        (static if str(v).strip().lower() in static_vals else dynamic).append(v)
+    return dynamic, static
+
+
+def flatten_json(json_object, keys_to_include):
+    flat_data = {}
+    for key in keys_to_include:
+        parts = key.split('.')
+        value = json_object
+        try:
+            for part in parts:
+                value = value.get(part) if isinstance(value, dict) else None
+            if key in special_expand_keys and isinstance(value, list):
+                dynamic, static = split_special(key, value)
+                flat_data[f"sorted_{key}"] = dynamic + static
+            elif isinstance(value, list):
+                if key in expand_arrays:
+                    for i, el in enumerate(value):
+                        flat_data[f"{key}_{i+1}"] = el
+                else:
+                    flat_data[key] = ", ".join(map(str, value))
+            else:
+                flat_data[key] = value if value not in (None, "") else "N/A"
+        except Exception:
+            flat_data[key] = "N/A"
+    return flat_data
+
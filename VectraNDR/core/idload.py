@@ -0,0 +1,147 @@
+"""
+Streaming detection-ID ingestion for the Tags exporter.
+
+load_ids() reads one or more ID files row by row (never the whole file at
+once), so it can run on a worker thread with progress and cancel:
+  - CSV with a "detection_id" header (case-insensitive, BOM tolerated):
+    that column is used
+  - anything else (plain text, headerless CSV): the first cell of each line
+Values are normalized (whitespace, quotes and a trailing ".0" from
+spreadsheet exports stripped) and must be positive integers. Bad rows are
+counted and a sample kept for the report; they never stop the load. The
+result is a sorted, deduplicated array('q') of IDs: 8 bytes per ID instead
+of a Python string each, ready for core.idpack.
+
+From the VectraNDR folder:
+  python -m core.idload ids.csv more_ids.txt
+"""
+
+import io
+import os
+import csv
+import argparse
+from array import array
+
+from core.pipeline import Cancelled
+
+HEADER = "detection_id"
+MAX_SAMPLES = 20
+REPORT_EVERY = 50000  # rows between progress/cancel checks
+MAX_ID = (1 << 63) - 1
+
+
+class IdLoad:
+    def __init__(self):
+        self.ids = array("q")
+        self.rows = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.samples = []  # [(path, line, value)] of the first invalid rows
+        self.files = []
+
+    def bad(self, path, line, value):
+        self.invalid += 1
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append((path, line, value))
+
+    def summary(self):
+        text = f"Loaded {len(self.ids)} IDs from {len(self.files)} file(s)"
+        extra = []
+        if self.duplicates:
+            extra.append(f"{self.duplicates} duplicates")
+        if self.invalid:
+            extra.append(f"{self.invalid} invalid rows")
+        return f"{text} ({', '.join(extra)} skipped)" if extra else text
+
+
+def parse_id(value):
+    """Positive int from a cell, or None."""
+    text = value.strip().strip('"\'').strip()
+    if text.endswith(".0"):
+        text = text[:-2]
+    if not text.isdigit() or not text.isascii():
+        return None
+    n = int(text)
+    # IDs are kept in array("q"); anything past a signed 64-bit int is malformed
+    return n if 0 < n <= MAX_ID else None
+
+
+def _read(path, result, raw_ids, cancel, on_progress, done_bytes, total_bytes):
+    with open(path, "rb") as raw:
+        text = io.TextIOWrapper(raw, encoding="utf-8-sig", errors="replace", newline="")
+        reader = csv.reader(text)
+        first = next(reader, None)
+        col = 0
+        if first is not None:
+            headers = [h.strip().lower() for h in first]
+            if HEADER in headers:
+                col = headers.index(HEADER)
+            else:
+                # Headerless: the first row is data
+                reader = _chain(first, reader)
+        for row in reader:
+            result.rows += 1
+            cell = row[col] if col < len(row) else ""
+            if not cell.strip():
+                if any(c.strip() for c in row):
+                    result.bad(path, reader.line_num, ",".join(row))
+                continue
+            n = parse_id(cell)
+            if n is None:
+                result.bad(path, reader.line_num, cell)
+            else:
+                raw_ids.append(n)
+            if result.rows % REPORT_EVERY == 0:
+                if cancel is not None and cancel.is_set():
+                    raise Cancelled()
+                if on_progress:
+                    on_progress((done_bytes + raw.tell()) // 1024, total_bytes // 1024)
+
+
+class _chain:
+    """csv.reader with one already-read row pushed back (keeps line_num)."""
+
+    def __init__(self, first, reader):
+        self.first = first
+        self.reader = reader
+
+    @property
+    def line_num(self):
+        return self.reader.line_num
+
+    def __iter__(self):
+        yield self.first
+        yield from self.reader
+
+
+def load_ids(paths, cancel=None, on_progress=None):
+    """IdLoad over every file in paths; on_progress(kb_done, kb_total)."""
+    result = IdLoad()
+    raw_ids = array("q")
+    total = sum(os.path.getsize(p) for p in paths)
+    done = 0
+    for path in paths:
+        _read(path, result, raw_ids, cancel, on_progress, done, total)
+        done += os.path.getsize(path)
+        result.files.append(path)
+    unique = sorted(set(raw_ids))
+    result.duplicates = len(raw_ids) - len(unique)
+    result.ids = array("q", unique)
+    if on_progress:
+        on_progress(total // 1024, total // 1024)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check detection-ID files the way the Tags exporter loads them")
+    parser.add_argument("files", nargs="+", help="CSV (detection_id column) or plain-text ID files")
+    args = parser.parse_args(argv)
+
+    result = load_ids(args.files)
+    print(result.summary())
+    for path, line, value in result.samples:
+        print(f"  {path}:{line}: {value!r}")
+
+
+if __name__ == "__main__":
+    main()
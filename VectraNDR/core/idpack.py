@@ -0,0 +1,137 @@
+"""
+Packs detection IDs into as few search queries as fit in a URL.
+
+pack_ids() sorts and deduplicates the IDs, collapses runs of consecutive
+numeric IDs into detection.id:[a TO b] ranges where that encodes shorter
+than listing them (a range costs ~40 bytes, so short runs stay as single
+IDs), puts the remaining IDs in one
+grouped term (detection.id:(12 OR 40 OR 97)) so the field prefix is written
+once per query instead of once per ID, and fills each query up to `budget`
+bytes of URL-encoded query_string. The budget is saved as "id_query_bytes"
+in core.config; the default stays well under the 8 KB request-line limit
+common to proxies and web servers.
+
+  >>> pack_ids(["5", "3", "7", "3"] + [str(n) for n in range(10, 20)])
+  ['detection.id:[10 TO 19] OR detection.id:(3 OR 5 OR 7)']
+"""
+
+import urllib.parse
+
+from core.config import load_config
+
+FIELD = "detection.id"
+DEFAULT_BUDGET = 6000
+MIN_BUDGET = 200
+
+
+def load_budget():
+    try:
+        return max(MIN_BUDGET, int(load_config().get("id_query_bytes", DEFAULT_BUDGET)))
+    except (TypeError, ValueError):
+        return DEFAULT_BUDGET
+
+
+def _enc(text):
+    # Same encoding core.pipeline.build_url applies to the query
+    return len(urllib.parse.quote(text))
+
+
+def normalize(ids):
+    """(sorted unique ints, sorted unique non-numeric strings)."""
+    numbers, others = set(), set()
+    for raw in ids:
+        if isinstance(raw, int):
+            # Already validated (core.idload)
+            numbers.add(raw)
+            continue
+        text = str(raw).strip()
+        if not text:
+            continue
+        if text.isdigit():
+            numbers.add(int(text))
+        else:
+            others.add(text)
+    return sorted(numbers), sorted(others)
+
+
+_SEP = _enc(" OR ")
+
+
+def runs(numbers):
+    """Sorted unique ints -> [(first, last)] of consecutive runs."""
+    out = []
+    for n in numbers:
+        if out and n == out[-1][1] + 1:
+            out[-1] = (out[-1][0], n)
+        else:
+            out.append((n, n))
+    return out
+
+
+def _range_pays(lo, hi, field):
+    """True if [lo TO hi] encodes shorter than its IDs as grouped singles."""
+    range_cost = _SEP + _enc(f"{field}:[{lo} TO {hi}]")
+    singles_cost = 0
+    for n in range(lo, hi + 1):
+        singles_cost += _SEP + len(str(n))
+        if singles_cost > range_cost:
+            return True
+    return False
+
+
+def _terms(ids, field):
+    """Range terms and single values, in ID order."""
+    numbers, others = normalize(ids)
+    for lo, hi in runs(numbers):
+        if _range_pays(lo, hi, field):
+            yield "range", f"{field}:[{lo} TO {hi}]"
+        else:
+            for n in range(lo, hi + 1):
+                yield "single", str(n)
+    for text in others:
+        yield "single", '"%s"' % text.replace('\\', '\\\\').replace('"', '\\"')
+
+
+class _Query:
+    SEP = _SEP
+
+    def __init__(self, field):
+        self.group_cost = _enc(f"{field}:()")
+        self.field = field
+        self.ranges = []
+        self.singles = []
+        self.size = 0
+
+    def cost(self, kind, text):
+        """Encoded bytes this term would add."""
+        if kind == "single" and self.singles:
+            return self.SEP + _enc(text)
+        extra = _enc(text) + (self.group_cost if kind == "single" else 0)
+        return extra + (self.SEP if self.ranges or self.singles else 0)
+
+    def add(self, kind, text, cost):
+        (self.singles if kind == "single" else self.ranges).append(text)
+        self.size += cost
+
+    def text(self):
+        parts = list(self.ranges)
+        if self.singles:
+            parts.append(f"{self.field}:({' OR '.join(self.singles)})")
+        return " OR ".join(parts)
+
+
+def pack_ids(ids, budget=None, field=FIELD):
+    """Query strings that together match every ID, each at most `budget` encoded bytes."""
+    budget = budget or load_budget()
+    queries, current = [], _Query(field)
+    for kind, text in _terms(ids, field):
+        cost = current.cost(kind, text)
+        if current.size and current.size + cost > budget:
+            queries.append(current.text())
+            current = _Query(field)
+            cost = current.cost(kind, text)
+        # A single term over budget still gets its own query
+        current.add(kind, text, cost)
+    if current.size:
+        queries.append(current.text())
+    return queries
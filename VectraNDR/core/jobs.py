@@ -0,0 +1,186 @@
+"""
+Export job queue for the detection exporter GUIs.
+
+Each job is one full pipeline run (time-field variant, brain, window,
+categories already baked into its query). Jobs wait in FIFO order and at
+most `limit` of them run at once; the limit is global to the window, can be
+changed while jobs are queued, and is saved as "max_concurrent_jobs" in
+core.config. Jobs against the same brain share one requests session, so
+concurrent exports reuse a single connection pool (and its TLS connections)
+instead of each opening their own.
+
+on_update(job) is called from worker threads whenever a job's status or
+progress changes; the GUI forwards it to the Tk thread through core.ui.
+"""
+
+import itertools
+import threading
+from collections import deque
+
+from core.config import load_config, save_config
+from core.enrich import Enricher
+from core.metrics import RunMetrics, publish
+from core.pipeline import Cancelled, open_session, run_pipeline
+from core.profiling import profiled
+from core.summary import Summary
+
+DEFAULT_LIMIT = 2
+MAX_LIMIT = 8  # Also the per-brain connection pool size
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+def load_limit():
+    try:
+        return max(1, min(int(load_config().get("max_concurrent_jobs", DEFAULT_LIMIT)), MAX_LIMIT))
+    except (TypeError, ValueError):
+        return DEFAULT_LIMIT
+
+
+def save_limit(limit):
+    save_config(max_concurrent_jobs=limit)
+
+
+class Job:
+    _ids = itertools.count(1)
+
+    def __init__(self, label, server, token, query, json_path, xlsx_path=None,
+                 dedupe=False, tz=None, summary=False, enrich=False):
+        self.id = next(Job._ids)
+        self.label = label
+        self.server = server
+        self.token = token
+        self.query = query
+        self.json_path = json_path
+        self.xlsx_path = xlsx_path
+        self.dedupe = dedupe
+        self.tz = tz
+        self.summary = summary
+        self.enrich = enrich
+        self.status = QUEUED
+        self.count = 0
+        self.total = None
+        self.detail = ""
+        self.cancel = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def progress_text(self):
+        return f"{self.count}/{self.total}" if self.total else str(self.count)
+
+
+class JobQueue:
+    def __init__(self, limit=None, on_update=None, verbose=False):
+        self.limit = limit or load_limit()
+        self.on_update = on_update
+        self.verbose = verbose
+        self.jobs = []
+        self._pending = deque()
+        self._running = 0
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def reserved_paths(self):
+        """Output paths of jobs that have not finished (for output_path)."""
+        with self._lock:
+            return {j.json_path for j in self.jobs if not j.finished}
+
+    def submit(self, job):
+        with self._lock:
+            self.jobs.append(job)
+            self._pending.append(job)
+        self._notify(job)
+        self._dispatch()
+        return job
+
+    def set_limit(self, limit):
+        self.limit = max(1, min(int(limit), MAX_LIMIT))
+        save_limit(self.limit)
+        self._dispatch()
+
+    def cancel(self, job):
+        job.cancel.set()
+        with self._lock:
+            if job.status != QUEUED:
+                return
+            self._pending.remove(job)
+            job.status = CANCELLED
+        self._notify(job)
+
+    def cancel_all(self):
+        for job in list(self.jobs):
+            if not job.finished:
+                self.cancel(job)
+
+    def clear_finished(self):
+        """Drop finished jobs; returns them."""
+        with self._lock:
+            done = [j for j in self.jobs if j.finished]
+            self.jobs = [j for j in self.jobs if not j.finished]
+        return done
+
+    def close(self):
+        self.cancel_all()
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for sess in sessions:
+            sess.close()
+
+    def _session(self, server):
+        with self._lock:
+            if server not in self._sessions:
+                self._sessions[server] = open_session(MAX_LIMIT)
+            return self._sessions[server]
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                if self._running >= self.limit or not self._pending:
+                    return
+                job = self._pending.popleft()
+                job.status = RUNNING
+                self._running += 1
+            self._notify(job)
+            threading.Thread(target=self._run, args=(job,), daemon=True,
+                             name=f"export-job-{job.id}").start()
+
+    def _run(self, job):
+        metrics = RunMetrics(f"job:{job.label}")
+        enricher = Enricher(job.server, job.token, metrics=metrics, cancel=job.cancel) if job.enrich else None
+
+        def progress(count, total):
+            job.count, job.total = count, total
+            self._notify(job)
+
+        try:
+            with profiled(f"job{job.id}", lambda: job.json_path):
+                job.count = run_pipeline(job.server, job.token, job.query, job.json_path,
+                                         job.xlsx_path, dedupe=job.dedupe, on_progress=progress,
+                                         tz=job.tz, metrics=metrics, cancel=job.cancel,
+                                         session=self._session(job.server),
+                                         summary=Summary() if job.summary else None,
+                                         enricher=enricher)
+            job.detail = publish(metrics, job.xlsx_path or job.json_path, self.verbose)
+            job.status = DONE
+        except Cancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.detail = str(e)
+            job.status = FAILED
+        finally:
+            if enricher is not None:
+                enricher.close()
+            with self._lock:
+                self._running -= 1
+            self._notify(job)
+            self._dispatch()
+
+    def _notify(self, job):
+        if self.on_update:
+            self.on_update(job)
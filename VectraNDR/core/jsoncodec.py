@@ -0,0 +1,82 @@
+"""
+JSON encode/decode used on the exporters' hot paths.
+
+Uses orjson when it is installed (several times faster on both parse and
+dump) and the stdlib json module otherwise; set $KAIZENKIT_JSON=json to
+force the stdlib. The functions accept and return the same types with
+either backend:
+
+  loads(data)         str, bytes, bytearray or memoryview; bytes are parsed
+                      without decoding to str first when the backend can
+  dumps(obj)          -> str        dumpb(obj) -> bytes
+  load(f) / dump(obj, f)   text or binary files
+  indent=True on the dump functions gives 2-space indentation.
+
+Output differs only in whitespace between backends (orjson writes compact
+separators), never in content.
+"""
+
+import io
+import os
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = None
+
+
+def _std_loads(data):
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def _std_dumps(obj, indent=False):
+    return json.dumps(obj, indent=2 if indent else None)
+
+
+def _std_dumpb(obj, indent=False):
+    return _std_dumps(obj, indent).encode("utf-8")
+
+
+def _or_loads(data):
+    return orjson.loads(data)
+
+
+def _or_dumpb(obj, indent=False):
+    opts = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    return orjson.dumps(obj, option=opts | orjson.OPT_INDENT_2 if indent else opts)
+
+
+def _or_dumps(obj, indent=False):
+    return _or_dumpb(obj, indent).decode("utf-8")
+
+
+def set_backend(name):
+    """Switch to "orjson" or "json" (e.g. for benchmarks); returns the backend in use."""
+    global BACKEND, loads, dumps, dumpb
+    if name == "orjson" and orjson is None:
+        raise ImportError("orjson is not installed")
+    if name == "orjson":
+        loads, dumps, dumpb = _or_loads, _or_dumps, _or_dumpb
+    else:
+        loads, dumps, dumpb = _std_loads, _std_dumps, _std_dumpb
+    BACKEND = name
+    return BACKEND
+
+
+def load(f):
+    return loads(f.read())
+
+
+def dump(obj, f, indent=False):
+    if isinstance(f, io.TextIOBase):
+        f.write(dumps(obj, indent))
+    else:
+        f.write(dumpb(obj, indent))
+
+
+set_backend(os.environ.get("KAIZENKIT_JSON") or ("orjson" if orjson is not None else "json"))
@@ -0,0 +1,134 @@
+"""
+Streaming reader for saved exports.
+
+iter_results() yields detections one at a time from a {"results": [...]}
+export (as written by core.pipeline or json.dump), a top-level JSON list,
+or JSON Lines, decoding from a rolling buffer so memory stays at one chunk
+plus one record however large the file is.
+
+.json exports are read through MappedExport, which memory-maps the file
+read-only and copies it out one chunk at a time: each chunk is decoded to
+str and records are parsed from that text with the stdlib raw_decode (not
+from the mapped bytes themselves; orjson has no incremental parser). The
+gain is bounded memory, not faster parsing: a multi-GB export is flattened
+without ever holding its whole text or object tree. done/size give byte
+progress for long conversions.
+"""
+
+import os
+import re
+import mmap
+import json
+import codecs
+from itertools import islice
+
+from core import jsoncodec
+
+CHUNK = 1 << 20
+_RESULTS = re.compile(r'"results"\s*:\s*\[')
+_SKIP = re.compile(r'[\s,]*')
+
+
+def iter_results(path, chunk_size=CHUNK):
+    if path.endswith(".jsonl"):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield jsoncodec.loads(line)
+        return
+    with MappedExport(path, chunk_size) as export:
+        yield from export
+
+
+class MappedExport:
+    """Records of a saved .json export, read from an mmap one copied chunk at a time."""
+
+    def __init__(self, path, chunk_size=CHUNK):
+        self.path = path
+        self.chunk_size = chunk_size
+        self._file = open(path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        # Zero-length files can't be mapped; they simply have no records
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+
+    @property
+    def done(self):
+        return self._map.tell() if self._map is not None else 0
+
+    def read(self, n):
+        """Next n bytes as text; multi-byte characters split across chunks are carried over."""
+        data = self._map.read(n)
+        return self._decode(data, final=not data)
+
+    def __iter__(self):
+        if self._map is None:
+            return iter(())
+        self._map.seek(0)
+        self._decode = codecs.getincrementaldecoder("utf-8")().decode
+        return _iter_array(self, self.chunk_size, self.path)
+
+    def batches(self, size):
+        """Lists of up to `size` records."""
+        records = iter(self)
+        while True:
+            batch = list(islice(records, size))
+            if not batch:
+                return
+            yield batch
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _iter_array(f, chunk_size, path):
+    decode = json.JSONDecoder().raw_decode
+    buf = f.read(chunk_size)
+    start = buf.lstrip()[:1]
+    if start == "[":
+        pos = buf.index("[") + 1
+    else:
+        # Find the results array, reading ahead until the key shows up
+        while True:
+            m = _RESULTS.search(buf)
+            if m:
+                pos = m.end()
+                break
+            more = f.read(chunk_size)
+            if not more:
+                # Not an export layout we can stream; fall back to a full load
+                data = json.loads(buf) if buf.strip() else {}
+                yield from (data.get("results", []) if isinstance(data, dict) else data)
+                return
+            buf += more
+    eof = False
+    while True:
+        pos = _SKIP.match(buf, pos).end()
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        if pos < len(buf):
+            try:
+                obj, end = decode(buf, pos)
+            except ValueError:
+                if eof:
+                    raise ValueError(f"{path}: malformed record near byte {pos}")
+            else:
+                # A record that ends exactly at the buffer edge may be a truncated number
+                if end < len(buf) or eof:
+                    yield obj
+                    pos = end
+                    continue
+        elif eof:
+            raise ValueError(f"{path}: unexpected end of file")
+        more = f.read(chunk_size)
+        eof = not more
+        buf = buf[pos:] + more
+        pos = 0
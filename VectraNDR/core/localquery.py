@@ -0,0 +1,333 @@
+"""
+Local query engine over saved exports.
+
+Evaluates the same query syntax the exporters send to the brain (see
+core.pipeline.build_query) against detections already on disk, so a
+downloaded window can be narrowed by category, host, tag, threat, ... without
+re-querying:
+
+  detection.category:"EXFILTRATION" AND detection.first_timestamp:[2024-01-01T0000 TO 2024-01-02T0000]
+  (detection.src_host.name:"host-1*" OR detection.tags:"true positive") AND NOT detection.state:"fixed"
+
+Supported: field:"value" (exact, case-insensitive, * and ? wildcards),
+field:value, field:[a TO b] / field:{a TO b} ranges (inclusive/exclusive,
+* for open ends; timestamps compare by their digits, so the query format
+2024-01-01T0000 and the API's 2024-01-01T00:00:00Z line up), AND / OR / NOT
+and parentheses. The "detection." prefix is optional; list fields such as
+tags match if any element does.
+
+Each field is indexed on first use (value -> row ids for matches, a sorted
+key list for ranges) and the boolean operators work on row-id sets, so
+follow-up queries over the same LocalIndex are answered without rescanning.
+load_index() shares one copy of each categorical value
+(core.compact.Interner) across all loaded records, and indexing normalizes
+each distinct value once.
+
+Sources: saved .json exports, .jsonl, .parquet (needs pandas + pyarrow),
+SQLite databases with a "detections" table and core.dataset directories.
+
+From the VectraNDR folder:
+  python -m core.localquery detections_*.json -q 'detection.threat:[50 TO *]' --group-by detection_type
+  python -m core.localquery export.json -q 'detection.tags:"true positive"' --out tp.json
+"""
+
+import os
+import re
+import json
+import bisect
+import sqlite3
+import argparse
+import fnmatch
+from collections import Counter
+
+from core import jsoncodec
+from core.compact import Interner
+
+_TOKEN = re.compile(r'''
+    \s*(?:
+      (?P<lparen>\()|(?P<rparen>\))|
+      (?P<op>AND|OR|NOT)(?=[\s()]|$)|
+      (?P<field>[\w.]+):(?:
+          "(?P<quoted>(?:[^"\\]|\\.)*)"|
+          (?P<lo_incl>[\[{])\s*(?P<lo>\S+)\s+TO\s+(?P<hi>[^\]}\s]+)\s*(?P<hi_incl>[\]}])|
+          (?P<bare>[^\s()]+)
+      )
+    )''', re.VERBOSE)
+
+
+class QueryError(ValueError):
+    """Raised for query text the parser can't handle."""
+
+
+# ---- parsing ----
+
+def tokenize(text):
+    pos, tokens = 0, []
+    text = text.strip()
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if not m or m.end() == pos:
+            raise QueryError(f"Can't parse query at: {text[pos:pos + 40]!r}")
+        pos = m.end()
+        if m.group("lparen"):
+            tokens.append(("(",))
+        elif m.group("rparen"):
+            tokens.append((")",))
+        elif m.group("op"):
+            tokens.append((m.group("op"),))
+        elif m.group("quoted") is not None:
+            tokens.append(("term", m.group("field"), re.sub(r'\\(.)', r'\1', m.group("quoted"))))
+        elif m.group("lo") is not None:
+            tokens.append(("range", m.group("field"), m.group("lo"), m.group("hi"),
+                           m.group("lo_incl") == "[", m.group("hi_incl") == "]"))
+        else:
+            tokens.append(("term", m.group("field"), m.group("bare")))
+        while pos < len(text) and text[pos].isspace():
+            pos += 1
+    return tokens
+
+
+def parse(text):
+    """Query text -> nested tuples: ("and"|"or", a, b), ("not", a), or a term/range token."""
+    tokens = tokenize(text)
+    pos = 0
+
+    def peek():
+        return tokens[pos][0] if pos < len(tokens) else None
+
+    def take():
+        nonlocal pos
+        pos += 1
+        return tokens[pos - 1]
+
+    def or_expr():
+        node = and_expr()
+        while peek() == "OR":
+            take()
+            node = ("or", node, and_expr())
+        return node
+
+    def and_expr():
+        node = not_expr()
+        # Adjacent terms without an operator are ANDed
+        while peek() in ("AND", "NOT", "(", "term", "range"):
+            if peek() == "AND":
+                take()
+            node = ("and", node, not_expr())
+        return node
+
+    def not_expr():
+        if peek() == "NOT":
+            take()
+            return ("not", not_expr())
+        if peek() == "(":
+            take()
+            node = or_expr()
+            if peek() != ")":
+                raise QueryError("Missing closing parenthesis")
+            take()
+            return node
+        if peek() in ("term", "range"):
+            return take()
+        raise QueryError(f"Unexpected {peek() or 'end of query'}")
+
+    if not tokens:
+        raise QueryError("Empty query")
+    node = or_expr()
+    if pos != len(tokens):
+        raise QueryError(f"Unexpected {tokens[pos][0]}")
+    return node
+
+
+# ---- values ----
+
+def field_path(field):
+    return field[len("detection."):] if field.startswith("detection.") else field
+
+
+def get_value(record, path):
+    if path in record:
+        return record[path]
+    value = record
+    for part in path.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def _norm(value):
+    return str(value).casefold()
+
+
+_TS = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+
+def range_key(value):
+    """Comparable key: numbers by value, timestamps by their digits, anything else as text."""
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, (int, float)):
+        return (0, value, "")
+    text = str(value)
+    if _TS.match(text):
+        return (1, 0, re.sub(r"\D", "", text).ljust(14, "0")[:14])
+    try:
+        return (0, float(text), "")
+    except ValueError:
+        return (2, 0, text.casefold())
+
+
+# ---- index ----
+
+class LocalIndex:
+    def __init__(self, records):
+        self.records = records
+        self.all = frozenset(range(len(records)))
+        self._eq = {}
+        self._sorted = {}
+
+    def _values(self, path):
+        for i, r in enumerate(self.records):
+            v = get_value(r, path)
+            if isinstance(v, list):
+                for el in v:
+                    yield i, el
+            elif v is not None:
+                yield i, v
+
+    def eq_index(self, path):
+        if path not in self._eq:
+            idx, norms = {}, {}
+            for i, v in self._values(path):
+                if isinstance(v, str):
+                    # Repeated (interned) values are casefolded once
+                    key = norms.get(v)
+                    if key is None:
+                        key = norms[v] = _norm(v)
+                else:
+                    key = _norm(v)
+                idx.setdefault(key, set()).add(i)
+            self._eq[path] = idx
+        return self._eq[path]
+
+    def sorted_index(self, path):
+        if path not in self._sorted:
+            pairs = sorted((range_key(v), i) for i, v in self._values(path))
+            self._sorted[path] = ([k for k, _ in pairs], [i for _, i in pairs])
+        return self._sorted[path]
+
+    def match_term(self, field, value):
+        idx = self.eq_index(field_path(field))
+        if value == "*":
+            return set().union(*idx.values()) if idx else set()
+        wanted = _norm(value)
+        if "*" in wanted or "?" in wanted:
+            rows = set()
+            for key, ids in idx.items():
+                if fnmatch.fnmatchcase(key, wanted):
+                    rows |= ids
+            return rows
+        return set(idx.get(wanted, ()))
+
+    def match_range(self, field, lo, hi, lo_incl, hi_incl):
+        keys, rows = self.sorted_index(field_path(field))
+        start = 0
+        stop = len(keys)
+        if lo != "*":
+            k = range_key(lo)
+            start = bisect.bisect_left(keys, k) if lo_incl else bisect.bisect_right(keys, k)
+        if hi != "*":
+            k = range_key(hi)
+            stop = bisect.bisect_right(keys, k) if hi_incl else bisect.bisect_left(keys, k)
+        return set(rows[start:stop])
+
+    def evaluate(self, node):
+        kind = node[0]
+        if kind == "and":
+            return self.evaluate(node[1]) & self.evaluate(node[2])
+        if kind == "or":
+            return self.evaluate(node[1]) | self.evaluate(node[2])
+        if kind == "not":
+            return self.all - self.evaluate(node[1])
+        if kind == "term":
+            return self.match_term(node[1], node[2])
+        return self.match_range(*node[1:])
+
+    def query(self, text):
+        """Matching records, in file order."""
+        return [self.records[i] for i in sorted(self.evaluate(parse(text)))]
+
+
+def group_by(records, field):
+    """Counter of values (list fields count each element)."""
+    counts = Counter()
+    path = field_path(field)
+    for r in records:
+        v = get_value(r, path)
+        for el in (v if isinstance(v, list) else [v]):
+            counts["N/A" if el in (None, "") else el] += 1
+    return counts
+
+
+# ---- sources ----
+
+def load_records(path):
+    if os.path.isdir(path):
+        from core.dataset import Dataset
+        return list(Dataset(path).scan())
+    if path.endswith(".jsonl"):
+        with open(path) as f:
+            return [jsoncodec.loads(line) for line in f if line.strip()]
+    if path.endswith(".parquet"):
+        import pandas as pd
+        return pd.read_parquet(path).to_dict("records")
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        with sqlite3.connect(path) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("SELECT * FROM detections").fetchall()
+        return [_sqlite_record(dict(r)) for r in rows]
+    with open(path, "rb") as f:
+        data = jsoncodec.load(f)
+    return data.get("results", []) if isinstance(data, dict) else data
+
+
+def _sqlite_record(row):
+    # A "json" column holds the full record; other columns are used as-is
+    if isinstance(row.get("json"), str):
+        return json.loads(row["json"])
+    return row
+
+
+def load_index(paths):
+    records, interner = [], Interner()
+    for path in paths:
+        records.extend(interner.record(r) for r in load_records(path))
+    return LocalIndex(records)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query saved Vectra detection exports locally")
+    parser.add_argument("files", nargs="+", help="Saved exports (.json, .jsonl, .parquet, .db) or dataset directories")
+    parser.add_argument("-q", "--query", default="id:*", help="Query in the brain's syntax (default: everything)")
+    parser.add_argument("--group-by", action="append", default=[], help="Field to count by (repeatable)")
+    parser.add_argument("--top", type=int, default=20, help="Rows per --group-by table")
+    parser.add_argument("--out", help="Write matching records as a {\"results\": [...]} export")
+    args = parser.parse_args(argv)
+
+    index = load_index(args.files)
+    try:
+        matches = index.query(args.query)
+    except QueryError as e:
+        parser.error(str(e))
+    print(f"{len(matches)} of {len(index.records)} detections match")
+    for field in args.group_by:
+        print(f"\n{field}:")
+        for value, n in group_by(matches, field).most_common(args.top):
+            print(f"  {n:>8}  {value}")
+    if args.out:
+        with open(args.out, "w") as f:
+            jsoncodec.dump({"results": matches}, f)
+        print(f"Saved: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
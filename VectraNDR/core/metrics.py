@@ -0,0 +1,175 @@
+"""
+Per-run timing and counters for the Vectra exporters.
+
+A RunMetrics object travels with one export run and collects:
+  - stage timings (fetch, parse, flatten, spill/dataframe, write_json, write_xlsx)
+  - network timings: DNS lookup and TCP+TLS connect (one probe per brain),
+    time-to-first-byte and download throughput per request
+  - record/page/byte counters and peak process memory
+At the end of the run the exporters show summary() in the status bar, print
+report() when -verbose is on, and save to_dict() as <export>.metrics.json.
+"""
+
+import os
+import json
+import time
+import socket
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unavailable."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return round(peak / (1024 * 1024 if os.uname().sysname == "Darwin" else 1024), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / (1024 * 1024), 1)
+    except ImportError:
+        return None
+
+
+class RunMetrics:
+    def __init__(self, name):
+        self.name = name
+        self.started = datetime.now(timezone.utc)
+        self.stages = {}     # stage -> seconds (summed across threads)
+        self.counters = {}   # counter -> int
+        self.requests = []   # one dict per HTTP request
+        self.network = {}    # dns / tcp / tls timings from probe()
+        self.wall_s = None
+        self.peak_mb = None
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+
+    # ---- collection ----
+
+    @contextmanager
+    def timer(self, stage):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - t0)
+
+    def add_time(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe_request(self, endpoint, status, ttfb_s, download_s, nbytes):
+        with self._lock:
+            self.requests.append({
+                "endpoint": endpoint, "status": status, "ttfb_s": round(ttfb_s, 4),
+                "download_s": round(download_s, 4), "bytes": nbytes,
+            })
+        self.add_time("fetch", ttfb_s + download_s)
+        self.count("requests")
+        self.count("bytes_downloaded", nbytes)
+
+    def probe(self, host, port=443, timeout=10):
+        """Time DNS resolution and TCP+TLS connect to host once."""
+        import ssl
+
+        try:
+            t0 = time.perf_counter()
+            addr = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)[0][4]
+            t1 = time.perf_counter()
+            ctx = ssl.create_default_context()
+            with socket.create_connection(addr[:2], timeout=timeout) as raw:
+                t2 = time.perf_counter()
+                with ctx.wrap_socket(raw, server_hostname=host):
+                    t3 = time.perf_counter()
+            self.network.update(dns_s=round(t1 - t0, 4), tcp_connect_s=round(t2 - t1, 4),
+                                tls_handshake_s=round(t3 - t2, 4))
+        except (OSError, ssl.SSLError) as e:
+            self.network["probe_error"] = str(e)
+
+    def finish(self):
+        self.wall_s = time.perf_counter() - self._t0
+        self.peak_mb = peak_rss_mb()
+        return self
+
+    # ---- reporting ----
+
+    def _net_totals(self):
+        ttfb = sum(r["ttfb_s"] for r in self.requests)
+        dl_s = sum(r["download_s"] for r in self.requests)
+        nbytes = sum(r["bytes"] for r in self.requests)
+        rate = nbytes / dl_s if dl_s > 0 else None
+        return ttfb, dl_s, nbytes, rate
+
+    def to_dict(self):
+        ttfb, dl_s, nbytes, rate = self._net_totals()
+        return {
+            "run": self.name,
+            "started": self.started.isoformat(),
+            "wall_s": round(self.wall_s or 0, 4),
+            "peak_rss_mb": self.peak_mb,
+            "stages_s": {k: round(v, 4) for k, v in self.stages.items()},
+            "counters": dict(self.counters),
+            "network": dict(self.network, ttfb_total_s=round(ttfb, 4),
+                            download_total_s=round(dl_s, 4), download_bytes=nbytes,
+                            download_bytes_per_s=round(rate) if rate else None),
+            "requests": self.requests,
+        }
+
+    def summary(self):
+        """One line for the status bar."""
+        ttfb, _, _, rate = self._net_totals()
+        parts = [f"{self.counters.get('records', 0)} records in {self.wall_s or 0:.1f}s"]
+        for stage in ("fetch", "parse", "flatten", "spill", "dataframe", "write_json", "write_xlsx"):
+            if stage in self.stages:
+                parts.append(f"{stage} {self.stages[stage]:.1f}s")
+        if self.requests:
+            parts.append(f"ttfb {ttfb:.1f}s")
+        if rate:
+            parts.append(f"{rate / (1024 * 1024):.1f} MB/s")
+        if self.peak_mb:
+            parts.append(f"peak {self.peak_mb:.0f} MB")
+        return " | ".join(parts)
+
+    def report(self):
+        """Multi-line breakdown for -verbose console output."""
+        d = self.to_dict()
+        lines = [f"[metrics] {self.name}: {self.summary()}"]
+        for stage, secs in d["stages_s"].items():
+            lines.append(f"[metrics]   {stage:<12} {secs:9.3f}s")
+        for key, val in d["network"].items():
+            lines.append(f"[metrics]   {key:<22} {val}")
+        for key, val in d["counters"].items():
+            lines.append(f"[metrics]   {key:<22} {val}")
+        return "\n".join(lines)
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return path
+
+
+def metrics_path(export_path):
+    """<export>.metrics.json next to the JSON/xlsx output."""
+    return os.path.splitext(export_path)[0] + ".metrics.json"
+
+
+def publish(metrics, export_path, verbose=False):
+    """Finish the run, save the metrics JSON and return the status-bar summary."""
+    metrics.finish()
+    try:
+        metrics.write_json(metrics_path(export_path))
+    except OSError as e:
+        if verbose:
+            print(f"Could not write metrics file: {e}")
+    if verbose:
+        print(metrics.report())
+    return metrics.summary()
@@ -0,0 +1,595 @@
+"""
+Single-pass fetch -> flatten -> write pipeline for the detection exporters.
+
+Instead of saving the raw JSON and re-reading it for "Flatten to Excel", the
+pipeline runs three stages connected by bounded queues:
+  - fetch:   pages of /api/v2.5/search/detections/ (following "next" links)
+  - flatten: each page's results through flatten_json
+  - write:   raw results streamed into the JSON file, flat rows spilled to
+             disk and laid out into the xlsx at the end (see core.spill)
+so network time overlaps with flattening and the JSON is never re-parsed.
+
+requests (and ssl) are imported on the first query, not at import time, so
+the exporter windows open without paying for them.
+
+Can also be run headless from the VectraNDR folder:
+  python -m core.pipeline --server brain.example --token XXX \\
+      --start "2024-01-01 00:00" --end "2024-01-02 00:00" --field first
+
+Scheduled mode with Prometheus metrics (see core.prom):
+  python -m core.pipeline --server brain.example --since-minutes 60 \\
+      --interval 3600 --prom-textfile /var/lib/node_exporter/textfile/vectra.prom
+"""
+
+import os
+import time
+import queue
+import argparse
+import threading
+import urllib.parse
+from functools import lru_cache
+
+from core.flatten import flatten_json, flatten_keys
+from core import jsoncodec
+from core.spill import SpillWriter
+from core.tz import load_display_tz, local_to_utc
+from core.metrics import RunMetrics, publish
+from core.summary import Summary, summary_path
+
+API_PATH = "/api/v2.5/search/detections/"
+PAGE_SIZE = 5000
+QUEUE_DEPTH = 4  # Pages held between stages; bounds memory per stage
+MAX_RETRIES = 4  # Per request, for 429/5xx and connection errors
+RETRY_STATUS = {429, 502, 503, 504}
+RETRY_BACKOFF = 2.0  # Seconds, doubled per attempt unless Retry-After says otherwise
+READ_CHUNK = 256 * 1024  # Response bytes read between cancel checks
+# (connect, read) seconds; read is the longest wait for the next byte, and a
+# large page can take the brain a while to start sending
+TIMEOUT = (15, 300)
+CANCEL_POLL = 0.1  # Seconds between cancel checks while a request is in flight
+
+categories = [
+    ("C2", "COMMAND & CONTROL", 1),
+    ("Botnet", "BOTNET ACTIVITY", 1),
+    ("Recon", "RECONNAISSANCE", 1),
+    ("Lateral", "LATERAL MOVEMENT", 1),
+    ("Exfil", "EXFILTRATION", 1),
+    ("Info", "INFO", 0)
+]
+
+# --field choices for the CLI, mapped to the timestamp fields queried
+time_field_sets = {
+    "first": ["first_timestamp"],
+    "created": ["created_timestamp"],
+    "last": ["last_timestamp"],
+    "cfl": ["last_timestamp", "first_timestamp", "created_timestamp"],
+}
+
+_DONE = object()
+
+
+@lru_cache(maxsize=None)
+def _adapter_class():
+    # Defined on first use so importing this module doesn't import requests/ssl
+    import ssl
+    import requests
+
+    class SystemCertAdapter(requests.adapters.HTTPAdapter):
+        def __init__(self, *args, **kwargs):
+            self.ssl_context = ssl.create_default_context()
+            super().__init__(*args, **kwargs)
+
+        def init_poolmanager(self, *args, **kwargs):
+            kwargs["ssl_context"] = self.ssl_context
+            return super().init_poolmanager(*args, **kwargs)
+
+    return SystemCertAdapter
+
+
+def __getattr__(name):
+    if name == "SystemCertAdapter":
+        return _adapter_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class PipelineError(Exception):
+    """Wraps an exception raised inside a pipeline stage thread."""
+
+
+class Cancelled(Exception):
+    """Raised when a run's cancel event is set."""
+
+
+def build_query(selected, time_fields, st_utc, et_utc, exclude_types=()):
+    cat_q = " OR ".join([f'detection.category:"{c}"' for c in selected])
+    time_queries = [f"detection.{f}:[{st_utc} TO {et_utc}]" for f in time_fields]
+    time_q = time_queries[0] if len(time_queries) == 1 else "(" + " OR ".join(time_queries) + ")"
+    exclusion_q = "".join(f' AND NOT detection.detection_type:"{dt}"' for dt in exclude_types)
+    return f"({cat_q}) AND {time_q}{exclusion_q}"
+
+
+def build_url(server, query, page_size=PAGE_SIZE, path=API_PATH):
+    # A bare FQDN means https; a full base URL (e.g. the bench mock brain) is used as-is
+    base = server.rstrip("/") if "://" in server else f"https://{server}"
+    encoded = urllib.parse.quote(query)
+    return f"{base}{path}?page_size={page_size}&query_string={encoded}"
+
+
+def output_path(start, end, tag=None, reserved=()):
+    """
+    Unique detections_<start>_<end>[_<tag>].json path in ~/Downloads. Paths
+    in reserved (handed out to queued jobs but not yet written) are skipped.
+    """
+    dl = os.path.join(os.path.expanduser("~"), "Downloads")
+    suffix = f"_{tag}" if tag else ""
+    fname = f"detections_{start}_{end}{suffix}.json".replace(" ", "T").replace(":", "").replace("-", "")
+    path = os.path.join(dl, fname)
+    cnt = 1
+    while os.path.exists(path) or path in reserved:
+        path = os.path.join(dl, f"{fname.split('.')[0]}_{cnt}.json")
+        cnt += 1
+    return path
+
+
+def open_session(pool_size=None):
+    """Session with the system CA store; pool_size sizes the connection pool when shared."""
+    import requests
+
+    SystemCertAdapter = _adapter_class()
+    sess = requests.Session()
+    if pool_size:
+        sess.mount("https://", SystemCertAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+        sess.mount("http://", requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+    else:
+        sess.mount("https://", SystemCertAdapter())
+    return sess
+
+
+def _retry_delay(resp, attempt):
+    retry_after = resp.headers.get("Retry-After") if resp is not None else None
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    return RETRY_BACKOFF * (2 ** attempt)
+
+
+def get_with_retry(sess, url, headers, metrics=None, cancel=None):
+    """
+    GET url (streamed), retrying 429/5xx responses and connection errors.
+    Returns (response, seconds to first byte of the final attempt).
+    """
+    return request_with_retry(sess, "GET", url, headers, metrics, cancel, stream=True)
+
+
+def _cancellable(fn, cancel, discard=None):
+    """
+    fn() on a helper thread, returning its result or raising its error - or
+    raising Cancelled as soon as cancel is set. An abandoned call still ends
+    on its own (requests time out), and discard(result) then cleans up
+    after it, e.g. by closing the response.
+    """
+    if cancel is None:
+        return fn()
+    lock = threading.Lock()
+    done = threading.Event()
+    state = {}
+
+    def run():
+        try:
+            state["result"] = fn()
+        except BaseException as e:
+            state["error"] = e
+        with lock:
+            done.set()
+            abandoned = state.get("abandoned")
+        if abandoned and discard is not None and "result" in state:
+            discard(state["result"])
+
+    threading.Thread(target=run, daemon=True).start()
+    while not done.wait(CANCEL_POLL):
+        if cancel.is_set():
+            with lock:
+                if not done.is_set():
+                    state["abandoned"] = True
+                    raise Cancelled()
+    if "error" in state:
+        raise state["error"]
+    return state["result"]
+
+
+def request_with_retry(sess, method, url, headers, metrics=None, cancel=None, **kwargs):
+    """
+    get_with_retry for any method; kwargs go to sess.request (json=, stream=,
+    ...). Every attempt has a TIMEOUT, and setting cancel abandons an attempt
+    still waiting on the server.
+    """
+    import requests
+
+    kwargs.setdefault("timeout", TIMEOUT)
+    for attempt in range(MAX_RETRIES + 1):
+        if cancel is not None and cancel.is_set():
+            raise Cancelled()
+        resp = None
+        t0 = time.perf_counter()
+        try:
+            resp = _cancellable(lambda: sess.request(method, url, headers=headers, **kwargs),
+                                cancel, discard=lambda r: r.close())
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt == MAX_RETRIES:
+                raise
+        else:
+            if resp.status_code not in RETRY_STATUS or attempt == MAX_RETRIES:
+                return resp, time.perf_counter() - t0
+            resp.close()
+        if metrics:
+            metrics.count("retries")
+            if resp is not None and resp.status_code == 429:
+                metrics.count("http_429")
+        delay = _retry_delay(resp, attempt)
+        if cancel is None:
+            time.sleep(delay)
+        elif cancel.wait(delay):
+            raise Cancelled()
+
+
+def read_body(resp, cancel=None):
+    """Read a streamed response; setting cancel stops it even mid-chunk."""
+    if cancel is None:
+        return resp.content
+
+    def read():
+        chunks = []
+        for chunk in resp.iter_content(READ_CHUNK):
+            if cancel.is_set():
+                break
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    try:
+        body = _cancellable(read, cancel)
+    except Cancelled:
+        # Closing the response also ends the abandoned read
+        resp.close()
+        raise
+    if cancel.is_set():
+        resp.close()
+        raise Cancelled()
+    return body
+
+
+def iter_pages(sess, url, token, metrics=None, cancel=None, on_count=None):
+    """
+    Yield the results list of every page, following the API's "next" links.
+    With metrics, records TTFB, download and parse time per page. Setting the
+    cancel event stops the run within CANCEL_POLL, even mid-request (raising
+    Cancelled). on_count(total) receives the API's "count" from the first page.
+    """
+    headers = {"Authorization": f"Token {token}"}
+    endpoint = urllib.parse.urlsplit(url).path
+    first = True
+    while url:
+        resp, ttfb = get_with_retry(sess, url, headers, metrics, cancel)
+        t0 = time.perf_counter() - ttfb  # Start of the final attempt
+        resp.raise_for_status()
+        body = read_body(resp, cancel)
+        t1 = time.perf_counter()
+        data = jsoncodec.loads(body)
+        if first and on_count and isinstance(data.get("count"), int):
+            on_count(data["count"])
+        first = False
+        if metrics:
+            metrics.observe_request(endpoint, resp.status_code, ttfb, t1 - t0 - ttfb, len(body))
+            metrics.add_time("parse", time.perf_counter() - t1)
+            metrics.count("pages")
+        yield data.get("results", []) or []
+        url = data.get("next")
+
+
+def _put(q, item, stop):
+    # Blocking put that gives up once another stage has failed
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.2)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q, stop):
+    while True:
+        try:
+            return q.get(timeout=0.2)
+        except queue.Empty:
+            if stop.is_set():
+                return _DONE
+
+
+def _stage(target, out_q, stop, errors):
+    def body():
+        try:
+            target()
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            # Always tell the next stage we're finished, even on failure
+            _put(out_q, _DONE, stop)
+    t = threading.Thread(target=body, daemon=True)
+    t.start()
+    return t
+
+
+def run_pipeline(server, token, query, json_path, xlsx_path=None,
+                 dedupe=False, keys=None, on_progress=None, tz=None, metrics=None,
+                 cancel=None, session=None, pages=None, summary=None, enricher=None):
+    """
+    Fetch every page for query, writing raw results to json_path and (if
+    given) flattened rows to xlsx_path. Returns the number of records written.
+    on_progress(records_done, total_or_None) is called from the writer after
+    each page. tz converts the xlsx timestamp columns to that timezone.
+    metrics (a core.metrics.RunMetrics) collects per-stage timings and
+    counters. The JSON is written as <json_path>.tmp and renamed only once
+    every page is in, so a failed run leaves no truncated export. Setting
+    the cancel event stops all stages, removes the partial output and
+    raises Cancelled. session (from open_session) lets concurrent runs
+    share one connection pool; it is left open. pages replaces the
+    fetch of server/query with any iterable of result pages (core.fanout
+    merges several brains this way); its "total" attribute, if set, is
+    reported as the progress total. summary (a core.summary.Summary) is fed
+    every record in the flatten stage and written as extra xlsx sheets plus
+    <json_path>.summary.json. enricher (a core.enrich.Enricher) adds host/
+    account details to each page before it is flattened and saved.
+    """
+    keys = keys or flatten_keys
+    if enricher is not None:
+        from core.enrich import enrich_keys
+        keys = keys + enrich_keys
+    pages_q = queue.Queue(maxsize=QUEUE_DEPTH)
+    rows_q = queue.Queue(maxsize=QUEUE_DEPTH)
+    stop = threading.Event()
+    errors = []
+    total = [None]
+
+    def fetch():
+        if pages is not None:
+            for page in pages:
+                if not _put(pages_q, page, stop):
+                    return
+            return
+        if metrics and "://" not in server:
+            metrics.probe(server)
+        sess = session or open_session()
+        try:
+            fetched = iter_pages(sess, build_url(server, query), token, metrics, cancel,
+                                 on_count=lambda n: total.__setitem__(0, n))
+            for page in fetched:
+                if not _put(pages_q, page, stop):
+                    return
+        finally:
+            if session is None:
+                sess.close()
+
+    def flatten():
+        seen = set()
+        while True:
+            page = _get(pages_q, stop)
+            if page is _DONE:
+                return
+            if dedupe:
+                unique = []
+                for d in page:
+                    if d.get("id") not in seen:
+                        seen.add(d.get("id"))
+                        unique.append(d)
+                page = unique
+            if enricher is not None:
+                t0 = time.perf_counter()
+                enricher.enrich(page)
+                if metrics:
+                    metrics.add_time("enrich", time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            rows = [flatten_json(d, keys) for d in page] if xlsx_path else None
+            if summary is not None:
+                summary.add_many(page)
+            if metrics and (rows is not None or summary is not None):
+                metrics.add_time("flatten", time.perf_counter() - t0)
+            if not _put(rows_q, (page, rows), stop):
+                return
+
+    threads = [_stage(fetch, pages_q, stop, errors), _stage(flatten, rows_q, stop, errors)]
+
+    count = 0
+    writer = SpillWriter(xlsx_path, tz=tz) if xlsx_path else None
+    # Written under a temporary name so a failed run never leaves a
+    # well-formed but truncated export behind
+    tmp_path = json_path + ".tmp"
+    try:
+        with open(tmp_path, "w") as jf:
+            jf.write('{"results": [')
+            while True:
+                item = _get(rows_q, stop)
+                if item is _DONE:
+                    break
+                if cancel is not None and cancel.is_set():
+                    raise Cancelled()
+                page, rows = item
+                t0 = time.perf_counter()
+                for d in page:
+                    jf.write(",\n" if count else "\n")
+                    jf.write(jsoncodec.dumps(d))
+                    count += 1
+                t1 = time.perf_counter()
+                if writer:
+                    writer.write_many(rows)
+                if metrics:
+                    metrics.add_time("write_json", t1 - t0)
+                    if writer:
+                        metrics.add_time("spill", time.perf_counter() - t1)
+                    metrics.count("records", len(page))
+                if on_progress:
+                    on_progress(count, total[0] or getattr(pages, "total", None))
+            jf.write("\n]}\n")
+    except Exception:
+        stop.set()
+        if writer:
+            writer.discard()
+        _remove(tmp_path)
+        raise
+    finally:
+        for t in threads:
+            t.join(timeout=5)
+
+    if errors:
+        if writer:
+            writer.discard()
+        _remove(tmp_path)
+        if isinstance(errors[0], Cancelled):
+            raise Cancelled()
+        raise PipelineError(str(errors[0])) from errors[0]
+    os.replace(tmp_path, json_path)
+
+    if summary is not None:
+        summary.write_json(summary_path(json_path))
+    if writer:
+        t0 = time.perf_counter()
+        if summary is not None:
+            summary.attach(writer)
+        writer.close()
+        if metrics:
+            metrics.add_time("write_xlsx", time.perf_counter() - t0)
+            metrics.count("output_bytes", os.path.getsize(xlsx_path))
+    if metrics:
+        metrics.count("output_bytes", os.path.getsize(json_path))
+    return count
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _window(args, tz_name):
+    """(start, end) strings in tz_name: --start/--end, or the last --since-minutes."""
+    if args.since_minutes:
+        from datetime import datetime, timedelta
+        from core.tz import get_zone, INPUT_FORMAT
+        end = datetime.now(get_zone(tz_name))
+        start = end - timedelta(minutes=args.since_minutes)
+        return start.strftime(INPUT_FORMAT), end.strftime(INPUT_FORMAT)
+    return args.start, args.end
+
+
+def run_once(args, tz_name, registry=None):
+    start, end = _window(args, tz_name)
+    selected = args.categories or [val for _, val, dflt in categories if dflt]
+    query = build_query(selected, time_field_sets[args.field], local_to_utc(start, tz_name),
+                        local_to_utc(end, tz_name), args.exclude_types)
+
+    json_path = output_path(start, end)
+    xlsx_path = None if args.no_excel else json_path.replace(".json", ".xlsx")
+    metrics = RunMetrics(f"pipeline:{args.field}")
+    enricher = None
+    if args.enrich:
+        from core.enrich import Enricher
+        enricher = Enricher(args.server, args.token, metrics=metrics)
+    status = "failure"
+    from core.profiling import profiled
+    try:
+        with profiled("pipeline", lambda: json_path, enabled=args.profile):
+            count = run_pipeline(args.server, args.token, query, json_path, xlsx_path,
+                                 dedupe=args.field == "cfl",
+                                 tz=tz_name if args.local_timestamps else None,
+                                 metrics=metrics, summary=Summary() if args.summary else None,
+                                 enricher=enricher)
+        status = "success"
+        print(f"{count} detections saved to: {json_path}")
+        if xlsx_path:
+            print(f"Excel saved: {xlsx_path}")
+        if args.dataset:
+            from core.dataset import Dataset
+            from core.jsonstream import iter_results
+            days = Dataset(args.dataset, create=True).write(iter_results(json_path))
+            print(f"Added to dataset {args.dataset} ({len(days)} partitions)")
+    finally:
+        if enricher is not None:
+            enricher.close()
+        print(publish(metrics, json_path, args.verbose))
+        if registry is not None:
+            from core.prom import record_run, write_textfile
+            record_run(registry, metrics, status)
+            if args.prom_textfile:
+                write_textfile(registry, args.prom_textfile)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Vectra detection export (fetch + flatten in one pass)")
+    parser.add_argument("--server", required=True, help="Vectra Brain FQDN")
+    parser.add_argument("--token", default=os.environ.get("VECTRA_TOKEN"),
+                        help="API token (default: $VECTRA_TOKEN)")
+    parser.add_argument("--start", help="Start time, YYYY-MM-DD HH:MM (in --tz)")
+    parser.add_argument("--end", help="End time, YYYY-MM-DD HH:MM (in --tz)")
+    parser.add_argument("--since-minutes", type=int,
+                        help="Instead of --start/--end, export the last N minutes (re-evaluated each --interval)")
+    parser.add_argument("--field", choices=sorted(time_field_sets), default="first",
+                        help="Timestamp field(s) the window applies to")
+    parser.add_argument("--category", action="append", dest="categories",
+                        help="Detection category to include (repeatable; default: GUI defaults)")
+    parser.add_argument("--exclude-type", action="append", dest="exclude_types", default=[],
+                        help="detection_type to exclude (repeatable)")
+    parser.add_argument("--tz", default=None,
+                        help="Timezone of --start/--end and local timestamps (default: saved setting)")
+    parser.add_argument("--local-timestamps", action="store_true",
+                        help="Write Excel timestamps as --tz datetimes instead of UTC strings")
+    parser.add_argument("--no-excel", action="store_true", help="Only save the JSON")
+    parser.add_argument("--summary", action="store_true",
+                        help="Also write category/type/tag/host/threat summaries (xlsx sheets + .summary.json)")
+    parser.add_argument("--dataset", help="Also add each export to this core.dataset directory")
+    parser.add_argument("--enrich", action="store_true",
+                        help="Add host/account details (key asset, groups, ...) via cached bulk lookups")
+    parser.add_argument("-v", "-verbose", "--verbose", action="store_true", dest="verbose",
+                        help="Print the per-stage timing breakdown")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write cProfile/collapsed-stack profiles next to the export")
+    parser.add_argument("--interval", type=int, default=0,
+                        help="Repeat the export every N seconds (scheduled mode)")
+    parser.add_argument("--prom-textfile",
+                        help="Write Prometheus metrics here after each run (node_exporter textfile collector)")
+    parser.add_argument("--prom-port", type=int,
+                        help="Serve Prometheus metrics on 127.0.0.1:PORT/metrics while running")
+    args = parser.parse_args(argv)
+
+    if not args.token:
+        parser.error("--token or $VECTRA_TOKEN is required")
+    if not args.since_minutes and not (args.start and args.end):
+        parser.error("--start and --end (or --since-minutes) are required")
+    tz_name = args.tz or load_display_tz()
+    try:
+        for text in _window(args, tz_name):
+            local_to_utc(text, tz_name)
+    except ValueError as e:
+        parser.error(str(e))
+
+    registry = None
+    if args.prom_textfile or args.prom_port:
+        from core.prom import Registry, serve
+        registry = Registry()
+    if args.prom_port:
+        serve(registry, args.prom_port)
+        print(f"Serving metrics on http://127.0.0.1:{args.prom_port}/metrics")
+
+    while True:
+        try:
+            run_once(args, tz_name, registry)
+        except Exception as e:
+            if not args.interval:
+                raise
+            print(f"Export failed: {e}")
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
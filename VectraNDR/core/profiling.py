@@ -0,0 +1,147 @@
+"""
+Profiling hook for slow exports.
+
+profiled(label, export_path_fn) wraps a run in cProfile plus a lightweight
+sampling profiler and, when the run ends, writes next to the export:
+  <export>.<label>.pstats     cProfile stats (open with pstats / snakeviz)
+  <export>.<label>.collapsed  sampled stacks in collapsed format
+                              (flamegraph.pl / speedscope)
+and prints the top hot functions. cProfile only sees the calling thread; the
+sampler covers every thread, including the pipeline's fetch/flatten stages.
+Only one cProfile can be active per process (Python 3.12+ refuses a second),
+so runs that overlap one already being profiled get the sampler only.
+Enabled by the --profile CLI flag or the hidden Ctrl+Shift+P toggle in the
+exporter GUIs.
+"""
+
+import io
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+SAMPLE_INTERVAL = 0.005  # Seconds between stack samples
+TOP_N = 15
+
+# Set by the CLI flag or the GUI toggle
+PROFILE = any(arg == '--profile' for arg in sys.argv[1:])
+# Held by the run whose cProfile is active
+_cprofile_lock = threading.Lock()
+
+
+class StackSampler:
+    """Samples every thread's Python stack on a timer (catches worker threads)."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        me = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if tid not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                root = names.get(tid, str(tid))
+                self.samples[";".join([root] + stack[::-1])] += 1
+
+    def write_collapsed(self, path):
+        with open(path, "w") as f:
+            for stack, n in self.samples.most_common():
+                f.write(f"{stack} {n}\n")
+        return path
+
+
+def toggle_profiling():
+    """Flip profiling on/off (GUI hotkey); returns the new state."""
+    global PROFILE
+    PROFILE = not PROFILE
+    return PROFILE
+
+
+def profile_paths(export_path, label):
+    base = os.path.splitext(export_path)[0]
+    return f"{base}.{label}.pstats", f"{base}.{label}.collapsed"
+
+
+def top_functions(profiler, n=TOP_N):
+    import pstats
+
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("tottime").print_stats(n)
+    return out.getvalue()
+
+
+@contextmanager
+def profiled(label, export_path_fn, enabled=None):
+    """
+    Profile the with-block when enabled (default: PROFILE). export_path_fn is
+    called after the block to find where the export landed (it may not be
+    known up front). Yields nothing useful; output paths are printed.
+    """
+    if not (PROFILE if enabled is None else enabled):
+        yield
+        return
+    import cProfile
+
+    profiler = None
+    if _cprofile_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Some other profiler (outside this module) is active
+            profiler = None
+            _cprofile_lock.release()
+    sampler = StackSampler().start()
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            _cprofile_lock.release()
+        sampler.stop()
+        elapsed = time.perf_counter() - t0
+        export_path = export_path_fn() or os.path.join(os.path.expanduser("~"), "Downloads", "vectra_export")
+        stats_path, collapsed_path = profile_paths(export_path, label)
+        try:
+            if profiler is not None:
+                profiler.dump_stats(stats_path)
+            sampler.write_collapsed(collapsed_path)
+            print(f"[profile] {label}: {elapsed:.2f}s, {sum(sampler.samples.values())} samples")
+            if profiler is not None:
+                print(f"[profile] pstats:    {stats_path}")
+            else:
+                print("[profile] cProfile busy with another run; sampled stacks only")
+            print(f"[profile] collapsed: {collapsed_path}")
+        except OSError as e:
+            print(f"[profile] could not write profile: {e}")
+        if profiler is not None:
+            print(top_functions(profiler))
+
+
+def run_profiled(fn, label, export_path_fn):
+    """Call fn() inside profiled(); used as a worker-thread target."""
+    with profiled(label, export_path_fn):
+        return fn()
@@ -0,0 +1,151 @@
+"""
+Prometheus / OpenMetrics surface for headless exporter runs.
+
+Each finished run's core.metrics.RunMetrics is folded into a Registry of
+counters, gauges and histograms, which can be:
+  - written atomically as a node_exporter textfile-collector file
+    (write_textfile, e.g. /var/lib/node_exporter/textfile/vectra_export.prom)
+  - served on a local HTTP endpoint (serve, GET /metrics)
+No prometheus_client dependency; the text exposition format is written here.
+
+Exposed series (prefix vectra_export_):
+  runs_total{status}, request_duration_seconds{endpoint} (histogram),
+  pages_fetched_total, retries_total, http_429_total, records_exported_total,
+  flatten_seconds_total, flatten_records_per_second, output_bytes_total,
+  stage_duration_seconds{stage}, last_run_duration_seconds,
+  last_run_timestamp_seconds, last_success_timestamp_seconds
+"""
+
+import os
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "vectra_export_"
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items()))
+    return "{" + inner + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = {}     # name -> (type, help)
+        self._values = {}   # name -> {labels tuple: value}
+        self._hists = {}    # name -> {labels tuple: [bucket counts, sum, count]}
+
+    def _declare(self, name, kind, help_text):
+        self._meta.setdefault(name, (kind, help_text))
+
+    def inc(self, name, value=1, help_text="", **labels):
+        with self._lock:
+            self._declare(name, "counter", help_text)
+            series = self._values.setdefault(name, {})
+            key = tuple(sorted(labels.items()))
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name, value, help_text="", **labels):
+        with self._lock:
+            self._declare(name, "gauge", help_text)
+            self._values.setdefault(name, {})[tuple(sorted(labels.items()))] = value
+
+    def observe(self, name, value, help_text="", buckets=LATENCY_BUCKETS, **labels):
+        with self._lock:
+            self._declare(name, "histogram", help_text)
+            series = self._hists.setdefault(name, {})
+            key = tuple(sorted(labels.items()))
+            hist = series.setdefault(key, [[0] * len(buckets), 0.0, 0, buckets])
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    hist[0][i] += 1
+            hist[1] += value
+            hist[2] += 1
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for name in sorted(self._meta):
+                kind, help_text = self._meta[name]
+                full = PREFIX + name
+                if help_text:
+                    lines.append(f"# HELP {full} {help_text}")
+                lines.append(f"# TYPE {full} {kind}")
+                if kind == "histogram":
+                    for key, (counts, total, n, buckets) in self._hists.get(name, {}).items():
+                        labels = dict(key)
+                        for bound, c in zip(buckets, counts):
+                            lines.append(f"{full}_bucket{_labels(dict(labels, le=bound))} {c}")
+                        lines.append(f"{full}_bucket{_labels(dict(labels, le='+Inf'))} {n}")
+                        lines.append(f"{full}_sum{_labels(labels)} {total}")
+                        lines.append(f"{full}_count{_labels(labels)} {n}")
+                else:
+                    for key, value in self._values.get(name, {}).items():
+                        lines.append(f"{full}{_labels(dict(key))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def record_run(registry, metrics, status="success"):
+    """Fold one finished RunMetrics into the registry."""
+    c = metrics.counters
+    now = time.time()
+    registry.inc("runs_total", 1, "Export runs by outcome", status=status)
+    for req in metrics.requests:
+        registry.observe("request_duration_seconds", req["ttfb_s"] + req["download_s"],
+                         "API request latency (TTFB + download)", endpoint=req["endpoint"])
+    registry.inc("pages_fetched_total", c.get("pages", 0), "Result pages fetched")
+    registry.inc("retries_total", c.get("retries", 0), "Retried API requests")
+    registry.inc("http_429_total", c.get("http_429", 0), "HTTP 429 responses from the brain")
+    registry.inc("records_exported_total", c.get("records", 0), "Detections written")
+    registry.inc("output_bytes_total", c.get("output_bytes", 0), "Bytes written to JSON/xlsx")
+    flatten_s = metrics.stages.get("flatten", 0.0)
+    registry.inc("flatten_seconds_total", flatten_s, "Seconds spent in flatten_json")
+    if flatten_s > 0:
+        registry.set("flatten_records_per_second", round(c.get("records", 0) / flatten_s, 1),
+                     "Flatten throughput of the last run")
+    for stage, secs in metrics.stages.items():
+        registry.set("stage_duration_seconds", round(secs, 4), "Per-stage time of the last run", stage=stage)
+    registry.set("last_run_duration_seconds", round(metrics.wall_s or 0, 4), "Wall time of the last run")
+    registry.set("last_run_timestamp_seconds", round(now), "Unix time the last run finished")
+    if status == "success":
+        registry.set("last_success_timestamp_seconds", round(now), "Unix time of the last successful run")
+
+
+def write_textfile(registry, path):
+    """Atomically write the registry for the node_exporter textfile collector."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(registry.render())
+    os.replace(tmp, path)
+    return path
+
+
+def serve(registry, port, host="127.0.0.1"):
+    """Serve GET /metrics on a daemon thread; returns the HTTP server."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
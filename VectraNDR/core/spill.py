@@ -0,0 +1,150 @@
+"""
+Constant-memory xlsx writer for flattened detections with fixed tag columns.
+
+The fixed "<key>_1..<key>_N" layout needs the largest dynamic/static tag count
+over every record before the header can be written. Rather than holding all
+flattened rows in memory, SpillWriter:
+  - writes each row to a temporary spill file as soon as it arrives,
+    tracking the max dynamic/static counts and column widths as it goes
+  - on close(), writes the final header and streams the spilled rows into an
+    openpyxl write-only workbook, padding the tag columns
+Memory stays flat regardless of the export size. Rows are written in chunks
+of CHUNK_ROWS so timestamp columns can be converted column-wise (see
+core.timestamps) when a display timezone is given. Small extra sheets (e.g.
+core.summary tables) can be queued with add_sheet() and are written after
+the detections sheet.
+"""
+
+import pickle
+import tempfile
+
+from core.flatten import special_expand_keys, split_special
+from core.timestamps import convert_rows, timestamp_columns
+
+MAX_COL_WIDTH = 60
+CHUNK_ROWS = 50000
+
+
+class SpillWriter:
+    def __init__(self, xlsx_path, sheet_name="Sheet1", tz=None):
+        self.xlsx_path = xlsx_path
+        self.sheet_name = sheet_name
+        self.tz = tz  # Display timezone for timestamp columns; None keeps UTC strings
+        self.count = 0
+        self._spill = tempfile.TemporaryFile()
+        self._columns = {}  # base column -> None, in first-seen order
+        self._max_dyn = {k: 0 for k in special_expand_keys}
+        self._max_st = {k: 0 for k in special_expand_keys}
+        self._widths = {}
+        self._extra_sheets = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def write(self, row):
+        """Spill one flatten_json row (with its sorted_<key> lists)."""
+        special = {}
+        for sk in special_expand_keys:
+            dyn, stc = split_special(sk, row.pop(f"sorted_{sk}", []))
+            special[sk] = (dyn, stc)
+            self._max_dyn[sk] = max(self._max_dyn[sk], len(dyn))
+            self._max_st[sk] = max(self._max_st[sk], len(stc))
+            self._track_width(sk, max((len(str(v)) for v in dyn + stc), default=0))
+        for col, val in row.items():
+            self._columns.setdefault(col, None)
+            self._track_width(col, len(str(val)))
+        pickle.dump((row, special), self._spill, pickle.HIGHEST_PROTOCOL)
+        self.count += 1
+
+    def write_many(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def add_sheet(self, title, header, rows):
+        """Queue an extra (small, in-memory) sheet to write on close()."""
+        self._extra_sheets.append((title, header, rows))
+
+    def _track_width(self, col, width):
+        if width > self._widths.get(col, 0):
+            self._widths[col] = width
+
+    def header(self):
+        cols = list(self._columns)
+        for sk in special_expand_keys:
+            total = self._max_dyn[sk] + self._max_st[sk]
+            cols += [f"{sk}_{i+1}" for i in range(total)]
+        return cols
+
+    def iter_rows(self):
+        """Yield padded value lists in header order from the spill file."""
+        base = list(self._columns)
+        self._spill.seek(0)
+        while True:
+            try:
+                row, special = pickle.load(self._spill)
+            except EOFError:
+                return
+            values = [_cell(row.get(c, "N/A")) for c in base]
+            for sk in special_expand_keys:
+                dyn, stc = special.get(sk, ([], []))
+                values += [_cell(v) for v in dyn] + [""] * (self._max_dyn[sk] - len(dyn))
+                values += [_cell(v) for v in stc] + [""] * (self._max_st[sk] - len(stc))
+            yield values
+
+    def close(self):
+        from openpyxl import Workbook
+        from openpyxl.utils import get_column_letter
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(self.sheet_name)
+        header = self.header()
+        for idx, col in enumerate(header, 1):
+            base = col.rsplit("_", 1)[0] if col not in self._widths else col
+            width = max(len(col), self._widths.get(base, 0)) + 2
+            if self.tz and col in timestamp_columns:
+                width = 21  # "yyyy-mm-dd h:mm:ss"
+            ws.column_dimensions[get_column_letter(idx)].width = min(width, MAX_COL_WIDTH)
+        ws.append(header)
+        chunk = []
+        for values in self.iter_rows():
+            chunk.append(values)
+            if len(chunk) >= CHUNK_ROWS:
+                self._flush(ws, header, chunk)
+                chunk = []
+        self._flush(ws, header, chunk)
+        for title, extra_header, rows in self._extra_sheets:
+            extra = wb.create_sheet(title[:31])  # Excel's sheet name limit
+            for idx, col in enumerate(extra_header, 1):
+                width = max([len(str(col))] + [len(str(r[idx - 1])) for r in rows]) + 2
+                extra.column_dimensions[get_column_letter(idx)].width = min(width, MAX_COL_WIDTH)
+            extra.append(extra_header)
+            for row in rows:
+                extra.append([_cell(v) for v in row])
+        wb.save(self.xlsx_path)
+        self._spill.close()
+        return self.count
+
+    def _flush(self, ws, header, chunk):
+        if self.tz and chunk:
+            convert_rows(chunk, header, self.tz)
+        for values in chunk:
+            ws.append(values)
+
+    def discard(self):
+        """Drop the spill file without writing the workbook."""
+        self._spill.close()
+
+
+def _cell(value):
+    # openpyxl only accepts scalars; stringify anything nested
+    if value is None:
+        return "N/A"
+    if isinstance(value, (dict, list, tuple, set)):
+        return str(value)
+    return value
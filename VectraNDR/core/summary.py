@@ -0,0 +1,155 @@
+"""
+Export summaries computed in the same streaming pass as the flatten stage.
+
+Summary.add() is called once per raw detection as it flows through the
+pipeline (or the Flatten to Excel loop), so the SOC pivot never needs a
+second load of the export:
+  - counts per detection_category, detection_type and tag
+  - threat and certainty in 25-point buckets, plus the threat x certainty
+    quadrants (Low / Medium / High / Critical, split at 50)
+  - top-K src_host.name by detection count
+
+Category/type/tag cardinality is small, so those are exact counters. Hosts
+can number in the tens of thousands, so they use the Space-Saving algorithm:
+at most `capacity` counters regardless of how many hosts appear, with the
+true top-K guaranteed to be kept and each count's over-estimate bounded by
+the reported error.
+
+The result is written as extra sheets next to the detections (SpillWriter
+.add_sheet) and/or as <export>.summary.json.
+"""
+
+import os
+import json
+import heapq
+from collections import Counter
+
+BUCKETS = [(0, 24), (25, 49), (50, 74), (75, 100)]
+QUADRANT_SPLIT = 50
+TOP_K = 50
+
+
+class SpaceSaving:
+    """Approximate heavy hitters in fixed memory (Metwally et al.)."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        # One (count, key) entry per tracked key; counts only grow, so an
+        # entry may be stale (too low) and is refreshed when it surfaces
+        self._heap = []
+
+    def add(self, key, n=1):
+        if key in self.counts:
+            self.counts[key] += n
+            return
+        floor = 0
+        if len(self.counts) >= self.capacity:
+            # Replace the current minimum; its count becomes the newcomer's error bound
+            while True:
+                count, victim = heapq.heappop(self._heap)
+                if self.counts[victim] == count:
+                    break
+                heapq.heappush(self._heap, (self.counts[victim], victim))
+            floor = self.counts.pop(victim)
+            self.errors.pop(victim)
+        self.counts[key] = floor + n
+        self.errors[key] = floor
+        heapq.heappush(self._heap, (floor + n, key))
+
+    def top(self, k):
+        """[(key, count, max over-count)] for the k largest counters."""
+        best = sorted(self.counts.items(), key=lambda kv: -kv[1])[:k]
+        return [(key, n, self.errors[key]) for key, n in best]
+
+
+def bucket(value):
+    if not isinstance(value, (int, float)):
+        return "N/A"
+    for lo, hi in BUCKETS:
+        if value <= hi:
+            return f"{lo}-{hi}"
+    return f"{BUCKETS[-1][0]}-{BUCKETS[-1][1]}"
+
+
+def quadrant(threat, certainty):
+    if not isinstance(threat, (int, float)) or not isinstance(certainty, (int, float)):
+        return "N/A"
+    high_t, high_c = threat >= QUADRANT_SPLIT, certainty >= QUADRANT_SPLIT
+    return {(True, True): "Critical", (True, False): "High",
+            (False, True): "Medium", (False, False): "Low"}[(high_t, high_c)]
+
+
+class Summary:
+    def __init__(self, top_k=TOP_K):
+        self.top_k = top_k
+        self.total = 0
+        self.categories = Counter()
+        self.types = Counter()
+        self.tags = Counter()
+        self.threat = Counter()
+        self.certainty = Counter()
+        self.quadrants = Counter()
+        # Extra headroom keeps the top-K accurate when counts are close
+        self.hosts = SpaceSaving(top_k * 10)
+
+    def add(self, det):
+        self.total += 1
+        self.categories[det.get("detection_category") or det.get("category") or "N/A"] += 1
+        self.types[det.get("detection_type") or "N/A"] += 1
+        for tag in det.get("tags") or ():
+            self.tags[tag] += 1
+        threat, certainty = det.get("threat"), det.get("certainty")
+        self.threat[bucket(threat)] += 1
+        self.certainty[bucket(certainty)] += 1
+        self.quadrants[quadrant(threat, certainty)] += 1
+        host = det.get("src_host") if isinstance(det.get("src_host"), dict) else {}
+        self.hosts.add(host.get("name") or "N/A")
+
+    def add_many(self, dets):
+        for det in dets:
+            self.add(det)
+
+    def to_dict(self):
+        return {
+            "total": self.total,
+            "detection_category": dict(self.categories.most_common()),
+            "detection_type": dict(self.types.most_common()),
+            "tags": dict(self.tags.most_common()),
+            "threat_buckets": dict(sorted(self.threat.items())),
+            "certainty_buckets": dict(sorted(self.certainty.items())),
+            "quadrants": dict(self.quadrants.most_common()),
+            "top_hosts": [{"name": name, "count": n, "max_overcount": err}
+                          for name, n, err in self.hosts.top(self.top_k)],
+        }
+
+    def sheets(self):
+        """[(title, header, rows)] for SpillWriter.add_sheet."""
+        def counts(title, label, counter):
+            return (title, [label, "count"], [[k, n] for k, n in counter.most_common()])
+
+        return [
+            counts("By category", "detection_category", self.categories),
+            counts("By type", "detection_type", self.types),
+            counts("By tag", "tag", self.tags),
+            ("Threat x certainty", ["bucket", "threat", "certainty"],
+             [[b, self.threat.get(b, 0), self.certainty.get(b, 0)]
+              for b in sorted(set(self.threat) | set(self.certainty))]),
+            counts("Quadrants", "quadrant", self.quadrants),
+            (f"Top {self.top_k} hosts", ["src_host.name", "count", "max_overcount"],
+             [list(t) for t in self.hosts.top(self.top_k)]),
+        ]
+
+    def attach(self, writer):
+        for title, header, rows in self.sheets():
+            writer.add_sheet(title, header, rows)
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return path
+
+
+def summary_path(export_path):
+    return os.path.splitext(export_path)[0] + ".summary.json"
@@ -0,0 +1,238 @@
+"""
+Tag write-back: apply tag edits made in a Tags exporter xlsx to the brain.
+
+diff_tags() compares the edited sheet (id + tags_N columns) with the JSON
+export it was flattened from and keeps only detections whose tag set
+actually changed; unchanged rows, blank tag cells and reordering are
+ignored, and sheet IDs missing from the export are reported, never sent.
+apply_changes() sends one PATCH /api/v2.5/tagging/detection/<id> with the
+full new tag list per changed detection, from a few worker threads sharing
+one connection pool, throttled to `rate` requests per second and retried on
+429/5xx like the exports. Every run writes a CSV report (id, removed,
+added, new tags, status); a dry run writes the report and sends nothing.
+
+From the VectraNDR folder (dry run unless --apply):
+  python -m core.tagsync --export detection_tags_X.json --sheet detection_tags_X.xlsx \\
+      --server brain.example --token-env VECTRA_TOKEN [--apply]
+"""
+
+import os
+import csv
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from core import jsoncodec
+from core.pipeline import Cancelled, open_session, request_with_retry
+
+TAG_PATH = "/api/v2.5/tagging/detection/"
+DEFAULT_WORKERS = 4
+DEFAULT_RATE = 10.0  # Requests per second across all workers
+DRY_RUN = "dry-run"
+OK = "ok"
+
+
+class TagChange:
+    __slots__ = ("id", "old", "new", "status")
+
+    def __init__(self, det_id, old, new):
+        self.id = det_id
+        self.old = old
+        self.new = new
+        self.status = DRY_RUN
+
+    @property
+    def added(self):
+        return [t for t in self.new if t not in self.old]
+
+    @property
+    def removed(self):
+        return [t for t in self.old if t not in self.new]
+
+
+def _clean(tags):
+    """Non-blank tags, stripped, first occurrence wins."""
+    seen = []
+    for t in tags:
+        text = str(t).strip() if t is not None else ""
+        if text and text not in seen:
+            seen.append(text)
+    return seen
+
+
+def _id(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip() if value is not None else ""
+    return int(text) if text.isdigit() else None
+
+
+def read_export_tags(json_path):
+    """{id: [tags]} from a saved {"results": [...]} export."""
+    with open(json_path, "rb") as f:
+        results = jsoncodec.load(f).get("results", [])
+    out = {}
+    for det in results:
+        det_id = _id(det.get("id"))
+        if det_id is not None:
+            out[det_id] = _clean(det.get("tags") or [])
+    return out
+
+
+def read_sheet_tags(xlsx_path):
+    """{id: [tags]} from the id and tags_N columns of an exported (and edited) sheet."""
+    from openpyxl import load_workbook  # Only needed for write-back
+
+    wb = load_workbook(xlsx_path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = [str(h).strip().lower() if h is not None else "" for h in next(rows, ())]
+        if "id" not in header:
+            raise ValueError(f"{xlsx_path}: no 'id' column")
+        id_col = header.index("id")
+        tag_cols = [i for i, h in enumerate(header) if h.startswith("tags_")]
+        out = {}
+        for row in rows:
+            det_id = _id(row[id_col]) if id_col < len(row) else None
+            if det_id is not None:
+                out[det_id] = _clean(row[i] for i in tag_cols if i < len(row))
+        return out
+    finally:
+        wb.close()
+
+
+def diff_tags(before, after):
+    """([TagChange] for changed tag sets, [sheet ids not in the export])."""
+    changes, unknown = [], []
+    for det_id, new in after.items():
+        old = before.get(det_id)
+        if old is None:
+            unknown.append(det_id)
+        elif set(old) != set(new):
+            changes.append(TagChange(det_id, old, new))
+    changes.sort(key=lambda c: c.id)
+    return changes, sorted(unknown)
+
+
+def report_path(export_path):
+    return os.path.splitext(export_path)[0] + ".tagsync.csv"
+
+
+def write_report(path, changes):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["id", "removed", "added", "tags", "status"])
+        for c in changes:
+            w.writerow([c.id, "; ".join(c.removed), "; ".join(c.added), "; ".join(c.new), c.status])
+    return path
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self, cancel=None):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            if cancel is None:
+                time.sleep(delay)
+            elif cancel.wait(delay):
+                raise Cancelled()
+
+
+def apply_changes(server, token, changes, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE,
+                  metrics=None, cancel=None, on_progress=None):
+    """PATCH each change; sets change.status to "ok" or the error. Returns the number applied."""
+    base = server.rstrip("/") if "://" in server else f"https://{server}"
+    headers = {"Authorization": f"Token {token}"}
+    limiter = RateLimiter(rate)
+    lock = threading.Lock()
+    done = [0, 0]  # finished, ok
+
+    def send(sess, change):
+        if cancel is not None and cancel.is_set():
+            return
+        limiter.wait(cancel)
+        try:
+            resp, _ = request_with_retry(sess, "PATCH", f"{base}{TAG_PATH}{change.id}", headers,
+                                         metrics, cancel, json={"tags": change.new})
+            change.status = OK if resp.ok else f"HTTP {resp.status_code}: {resp.text[:200]}"
+            resp.close()
+        except Cancelled:
+            return
+        except Exception as e:
+            change.status = str(e)
+        with lock:
+            done[0] += 1
+            done[1] += change.status == OK
+            finished = done[0]
+        if on_progress:
+            on_progress(finished, len(changes))
+
+    with open_session(workers) as sess, ThreadPoolExecutor(workers) as pool:
+        for future in [pool.submit(send, sess, c) for c in changes]:
+            future.result()
+    if metrics:
+        metrics.count("tag_updates", done[1])
+        metrics.count("tag_failures", done[0] - done[1])
+    if cancel is not None and cancel.is_set():
+        raise Cancelled()
+    return done[1]
+
+
+def update_export(json_path, changes):
+    """Write applied tags back into the JSON export so a re-run diffs clean."""
+    applied = {c.id: c.new for c in changes if c.status == OK}
+    if not applied:
+        return 0
+    with open(json_path, "rb") as f:
+        data = jsoncodec.load(f)
+    for det in data.get("results", []):
+        det_id = _id(det.get("id"))
+        if det_id in applied:
+            det["tags"] = applied[det_id]
+    tmp = json_path + ".tmp"
+    with open(tmp, "wb") as f:
+        jsoncodec.dump(data, f, indent=True)
+    os.replace(tmp, json_path)
+    return len(applied)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write tag edits from an exported sheet back to Vectra")
+    parser.add_argument("--export", required=True, help="JSON export the sheet was flattened from")
+    parser.add_argument("--sheet", help="Edited xlsx (default: the export's .xlsx)")
+    parser.add_argument("--server", help="Vectra Brain FQDN")
+    parser.add_argument("--token-env", default="VECTRA_TOKEN", help="Environment variable holding the API token")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent requests")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Max requests per second")
+    parser.add_argument("--apply", action="store_true", help="Send the changes (default: dry run)")
+    args = parser.parse_args(argv)
+
+    sheet = args.sheet or os.path.splitext(args.export)[0] + ".xlsx"
+    changes, unknown = diff_tags(read_export_tags(args.export), read_sheet_tags(sheet))
+    if unknown:
+        print(f"{len(unknown)} sheet IDs are not in the export and were skipped")
+    if args.apply and changes:
+        token = os.environ.get(args.token_env, "")
+        if not args.server or not token:
+            parser.error(f"--apply needs --server and ${args.token_env}")
+        ok = apply_changes(args.server, token, changes, args.workers, args.rate)
+        update_export(args.export, changes)
+        print(f"{ok} of {len(changes)} detections re-tagged")
+    else:
+        print(f"{len(changes)} detections would be re-tagged")
+    print(f"Report: {write_report(report_path(args.export), changes)}")
+
+
+if __name__ == "__main__":
+    main()
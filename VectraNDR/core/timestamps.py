@@ -0,0 +1,50 @@
+"""
+Vectorized conversion of detection timestamps for the Excel output.
+
+The API returns created/first/last_timestamp as UTC ISO strings. When a
+display timezone (core.tz) is requested, each timestamp column is parsed and
+converted in one pandas call per column (per chunk of rows) instead of
+per-row localize(), then written as real (naive, local) Excel datetimes.
+"""
+
+from functools import lru_cache
+
+timestamp_columns = ["created_timestamp", "first_timestamp", "last_timestamp"]
+
+
+@lru_cache(maxsize=None)
+def _parse_kwargs():
+    """format="ISO8601" exists from pandas 2.0; older versions parse ISO by default."""
+    import pandas as pd
+
+    major = int(pd.__version__.split(".")[0])
+    return {"format": "ISO8601"} if major >= 2 else {}
+
+
+def convert_column(values, tz_name):
+    """
+    Convert a list of UTC timestamp strings to naive datetimes in tz_name.
+    Unparseable or missing values come back as "N/A".
+    """
+    import pandas as pd
+
+    raw = pd.Series(values, dtype=object)
+    # Decided by version, not by exception: errors="coerce" can turn an
+    # unsupported format into all-NaT instead of raising
+    parsed = pd.to_datetime(raw, utc=True, errors="coerce", **_parse_kwargs())
+    local = parsed.dt.tz_convert(tz_name).dt.tz_localize(None)
+    valid = local.notna().tolist()
+    converted = local.dt.to_pydatetime().tolist()
+    return [v if ok else "N/A" for v, ok in zip(converted, valid)]
+
+
+def convert_rows(rows, header, tz_name):
+    """Convert the timestamp columns of a chunk of value lists in place."""
+    for col in timestamp_columns:
+        if col not in header:
+            continue
+        idx = header.index(col)
+        converted = convert_column([r[idx] for r in rows], tz_name)
+        for r, v in zip(rows, converted):
+            r[idx] = v
+    return rows
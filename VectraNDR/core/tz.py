@@ -0,0 +1,59 @@
+"""
+Display timezone handling shared by the Vectra exporters.
+
+The timezone used for the Start/End inputs and for local Excel timestamps is
+a single setting: the GUI selector, the --tz CLI flag and the "timezone" key
+in core.config all feed it. Zones come from zoneinfo (install tzdata on
+Windows) and are cached, so repeated conversions don't rebuild tz objects.
+"""
+
+from datetime import datetime, timezone as _timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from core.config import load_config, save_config
+
+DEFAULT_TZ = "Asia/Kuala_Lumpur"
+
+# Offered in the GUI selector; any IANA name can be typed in
+common_zones = [
+    "Asia/Kuala_Lumpur", "Asia/Singapore", "Asia/Jakarta", "Asia/Tokyo",
+    "Asia/Kolkata", "Asia/Dubai", "Australia/Sydney", "Europe/London",
+    "Europe/Berlin", "America/New_York", "America/Chicago",
+    "America/Los_Angeles", "UTC",
+]
+
+INPUT_FORMAT = "%Y-%m-%d %H:%M"
+QUERY_FORMAT = "%Y-%m-%dT%H%M"
+
+
+@lru_cache(maxsize=None)
+def get_zone(name):
+    """Cached ZoneInfo lookup; raises ValueError for unknown names."""
+    if name.upper() == "UTC":
+        return _timezone.utc
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {name}") from None
+
+
+def load_display_tz():
+    name = load_config().get("timezone") or DEFAULT_TZ
+    try:
+        get_zone(name)
+    except ValueError:
+        return DEFAULT_TZ
+    return name
+
+
+def save_display_tz(name):
+    get_zone(name)
+    if load_config().get("timezone") != name:
+        save_config(timezone=name)
+
+
+def local_to_utc(text, tz_name):
+    """Convert "YYYY-MM-DD HH:MM" in tz_name to the query's UTC format."""
+    dt = datetime.strptime(text, INPUT_FORMAT).replace(tzinfo=get_zone(tz_name))
+    return dt.astimezone(_timezone.utc).strftime(QUERY_FORMAT)
@@ -0,0 +1,223 @@
+"""
+Worker-thread -> Tk plumbing shared by the exporter GUIs.
+
+Tk widgets must only be touched from the main thread. Workers call
+UiQueue.post(fn, *args) instead, and the main loop drains the queue with
+after(). ProgressPanel is a determinate progress bar with a detail line
+(done/total, throughput, ETA) and a Cancel button wired to a threading.Event
+that the pipeline checks between pages and download chunks. JobPanel is the
+export queue (core.jobs): variant picker, Add to Queue, concurrency limit and
+a per-job status table.
+"""
+
+import time
+import queue
+import threading
+import traceback
+import tkinter as tk
+
+import ttkbootstrap as ttk
+
+from core.jobs import JobQueue, MAX_LIMIT
+
+
+class UiQueue:
+    def __init__(self, root, interval_ms=50):
+        self.root = root
+        self.interval_ms = interval_ms
+        self._q = queue.Queue()
+        root.after(interval_ms, self._drain)
+
+    def post(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on the Tk main thread (safe from any thread)."""
+        self._q.put((fn, args, kwargs))
+
+    def _drain(self):
+        try:
+            while True:
+                try:
+                    fn, args, kwargs = self._q.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    fn(*args, **kwargs)
+                except Exception:
+                    # One bad callback must not stop status/progress updates for good
+                    traceback.print_exc()
+        finally:
+            self.root.after(self.interval_ms, self._drain)
+
+
+def _fmt_eta(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class ProgressTracker:
+    """Throughput and ETA for a running export."""
+
+    def __init__(self, unit="detections"):
+        self.unit = unit
+        self.t0 = time.perf_counter()
+        self.done = 0
+        self.total = None
+
+    def update(self, done, total=None):
+        self.done = done
+        if total:
+            self.total = total
+
+    def fraction(self):
+        if not self.total:
+            return None
+        return min(self.done / self.total, 1.0)
+
+    def text(self):
+        elapsed = time.perf_counter() - self.t0
+        rate = self.done / elapsed if elapsed > 0 else 0
+        parts = [f"{self.done}/{self.total} {self.unit}" if self.total else f"{self.done} {self.unit}"]
+        parts.append(f"{rate:,.0f}/s")
+        if self.total and rate > 0 and self.done < self.total:
+            parts.append(f"ETA {_fmt_eta((self.total - self.done) / rate)}")
+        return " | ".join(parts)
+
+
+class ProgressPanel:
+    """Progress bar + detail label + Cancel button, gridded into parent."""
+
+    def __init__(self, parent, ui, row, columnspan=2):
+        self.ui = ui
+        self.cancel_event = None
+        self.tracker = None
+        frame = ttk.Frame(parent)
+        frame.grid(row=row, column=0, columnspan=columnspan, sticky='ew', pady=5)
+        frame.columnconfigure(0, weight=1)
+        self.bar = ttk.Progressbar(frame, mode='determinate', maximum=1000, bootstyle="info-striped")
+        self.bar.grid(row=0, column=0, sticky='ew')
+        self.cancel_button = ttk.Button(frame, text="Cancel", bootstyle="danger-outline",
+                                        state='disabled', command=self.cancel)
+        self.cancel_button.grid(row=0, column=1, padx=(5, 0))
+        self.detail = ttk.Label(frame, text="")
+        self.detail.grid(row=1, column=0, columnspan=2, sticky='w')
+
+    # ---- main thread ----
+
+    def start(self, unit="detections"):
+        """Reset for a new run; returns the cancel event to hand to the worker."""
+        self.cancel_event = threading.Event()
+        self.tracker = ProgressTracker(unit)
+        self.bar.config(mode='indeterminate', value=0)
+        self.bar.start(20)
+        self.detail.config(text="Starting...")
+        self.cancel_button.config(state='normal')
+        return self.cancel_event
+
+    def cancel(self):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.cancel_button.config(state='disabled')
+            self.detail.config(text="Cancelling...")
+
+    def _apply(self, done, total):
+        self.tracker.update(done, total)
+        frac = self.tracker.fraction()
+        if frac is not None and str(self.bar.cget('mode')) != 'determinate':
+            self.bar.stop()
+            self.bar.config(mode='determinate')
+        if frac is not None:
+            self.bar.config(value=frac * 1000)
+        if not (self.cancel_event and self.cancel_event.is_set()):
+            self.detail.config(text=self.tracker.text())
+
+    def _finish(self, text):
+        self.bar.stop()
+        self.bar.config(mode='determinate', value=1000 if text is None else 0)
+        self.detail.config(text=self.tracker.text() if text is None and self.tracker else (text or ""))
+        self.cancel_button.config(state='disabled')
+
+    # ---- any thread ----
+
+    def report(self, done, total=None):
+        self.ui.post(self._apply, done, total)
+
+    def finish(self, text=None):
+        """text=None means success (bar full); otherwise shown as the reason."""
+        self.ui.post(self._finish, text)
+
+
+class JobPanel:
+    """Export queue: one row per job with status and progress."""
+
+    columns = ("job", "status", "progress", "detail")
+
+    def __init__(self, parent, ui, row, on_add, variants, variant, columnspan=2, verbose=False):
+        self.ui = ui
+        self.rows = {}
+        self.queue = JobQueue(on_update=lambda job: ui.post(self._update, job), verbose=verbose)
+        frame = ttk.Labelframe(parent, text="Export queue", padding=5)
+        frame.grid(row=row, column=0, columnspan=columnspan, sticky='nsew', pady=5)
+        frame.columnconfigure(0, weight=1)
+
+        bar = ttk.Frame(frame)
+        bar.grid(row=0, column=0, sticky='ew')
+        ttk.Label(bar, text="Timestamp field:").pack(side='left')
+        self.variant_var = tk.StringVar(value=variant)
+        ttk.Combobox(bar, textvariable=self.variant_var, values=variants, width=8,
+                     state='readonly').pack(side='left', padx=5)
+        ttk.Button(bar, text="Add to Queue", bootstyle="info", command=on_add).pack(side='left', padx=5)
+        ttk.Label(bar, text="Concurrent:").pack(side='left', padx=(15, 0))
+        self.limit_var = tk.IntVar(value=self.queue.limit)
+        spin = ttk.Spinbox(bar, from_=1, to=MAX_LIMIT, width=3, textvariable=self.limit_var,
+                           command=self._set_limit)
+        spin.pack(side='left', padx=5)
+        spin.bind('<Return>', lambda evt: self._set_limit())
+        spin.bind('<FocusOut>', lambda evt: self._set_limit())
+
+        self.tree = ttk.Treeview(frame, columns=self.columns, show='headings', height=5)
+        for col, width in zip(self.columns, (260, 80, 100, 260)):
+            self.tree.heading(col, text=col.title())
+            self.tree.column(col, width=width, stretch=col in ("job", "detail"))
+        self.tree.grid(row=1, column=0, sticky='nsew', pady=5)
+
+        buttons = ttk.Frame(frame)
+        buttons.grid(row=2, column=0, sticky='e')
+        ttk.Button(buttons, text="Cancel Selected", bootstyle="danger-outline",
+                   command=self._cancel_selected).pack(side='left', padx=5)
+        ttk.Button(buttons, text="Clear Finished", bootstyle="secondary-outline",
+                   command=self._clear_finished).pack(side='left')
+
+    @property
+    def variant(self):
+        return self.variant_var.get()
+
+    def submit(self, job):
+        return self.queue.submit(job)
+
+    def reserved_paths(self):
+        return self.queue.reserved_paths()
+
+    def _set_limit(self):
+        try:
+            self.queue.set_limit(self.limit_var.get())
+        except (ValueError, tk.TclError):
+            pass
+
+    def _update(self, job):
+        values = (job.label, job.status, job.progress_text(), job.detail)
+        if job.id in self.rows:
+            if self.tree.exists(self.rows[job.id]):
+                self.tree.item(self.rows[job.id], values=values)
+        else:
+            self.rows[job.id] = self.tree.insert('', 'end', values=values)
+
+    def _cancel_selected(self):
+        selected = set(self.tree.selection())
+        for job in self.queue.jobs:
+            if self.rows.get(job.id) in selected:
+                self.queue.cancel(job)
+
+    def _clear_finished(self):
+        for job in self.queue.clear_finished():
+            item = self.rows.pop(job.id, None)
+            if item and self.tree.exists(item):
+                self.tree.delete(item)
@@ -0,0 +1,253 @@
+"""
+Tail mode: poll the brain for new/updated detections and append JSON Lines.
+
+Each poll asks only for detections whose last_timestamp is at or after the
+watermark (the newest last_timestamp seen so far) instead of re-downloading
+a whole window. The query format has minute resolution, so the current
+minute is re-read every poll and records already written (same id and
+last_timestamp) are skipped; a detection that is updated later has a new
+last_timestamp and is appended again.
+
+  - one pooled session is kept for the whole run
+  - the interval halves after a poll that found detections and grows by
+    half after an idle one, within --min-interval/--max-interval
+  - output rotates to a new <prefix>_<UTC time>.jsonl by size and/or age
+  - the watermark is saved in <prefix>.state.json, so a restart resumes
+    where it stopped (first start: the last --since-minutes)
+
+From the VectraNDR folder (Ctrl+C to stop):
+  python -m core.watch --server brain.example --out-dir ~/Downloads/vectra-tail \\
+      --min-interval 10 --max-interval 300 --rotate-mb 100 --rotate-hours 24
+"""
+
+import os
+import json
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+
+from core.tz import QUERY_FORMAT
+from core import jsoncodec
+from core.pipeline import Cancelled, build_query, build_url, categories, iter_pages, open_session
+
+API_TS_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+DEFAULT_MIN_INTERVAL = 10
+DEFAULT_MAX_INTERVAL = 300
+
+
+def parse_ts(text):
+    try:
+        return datetime.strptime(text, API_TS_FORMAT).replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveInterval:
+    def __init__(self, low=DEFAULT_MIN_INTERVAL, high=DEFAULT_MAX_INTERVAL):
+        self.low = low
+        self.high = max(low, high)
+        self.current = low
+
+    def next(self, found):
+        if found:
+            self.current = max(self.low, self.current / 2)
+        else:
+            self.current = min(self.high, self.current * 1.5)
+        return self.current
+
+    def backoff(self):
+        self.current = self.high
+        return self.current
+
+
+class RotatingJsonl:
+    """Appends records to <prefix>_<UTC time>.jsonl, starting a new file by size/age."""
+
+    def __init__(self, directory, prefix, max_bytes=None, max_seconds=None):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.path = None
+        self._file = None
+        self._opened = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def _open(self):
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        base = os.path.join(self.directory, f"{self.prefix}_{stamp}")
+        path, n = base + ".jsonl", 1
+        while os.path.exists(path):
+            path, n = f"{base}_{n}.jsonl", n + 1
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._opened = time.monotonic()
+
+    def _due(self):
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            return True
+        return bool(self.max_seconds) and time.monotonic() - self._opened >= self.max_seconds
+
+    def write(self, records):
+        if not records:
+            return
+        if self._file is not None and self._due():
+            self.close()
+        if self._file is None:
+            self._open()
+        for rec in records:
+            self._file.write(jsoncodec.dumps(rec))
+            self._file.write("\n")
+        # Dashboards tail the file; make each poll's records visible at once
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class Watermark:
+    """Newest last_timestamp written, plus the (id, last_timestamp) keys of its minute."""
+
+    def __init__(self, path, since_minutes=60):
+        self.path = path
+        self.value = None
+        self.recent = set()
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            self.value = parse_ts(data.get("watermark"))
+            self.recent = {tuple(k) for k in data.get("recent", [])}
+        except (OSError, ValueError, TypeError):
+            pass
+        if self.value is None:
+            start = datetime.now(timezone.utc) - timedelta(minutes=since_minutes)
+            self.value = start.replace(second=0, microsecond=0)
+
+    def query_start(self):
+        return self.value.strftime(QUERY_FORMAT)
+
+    def accept(self, records):
+        """Records not written before; advances the watermark."""
+        fresh = []
+        for rec in records:
+            ts = rec.get("last_timestamp")
+            key = (rec.get("id"), ts)
+            if key in self.recent:
+                continue
+            fresh.append(rec)
+            when = parse_ts(ts)
+            if when is None:
+                # Can't advance the watermark, but it mustn't be appended again every poll;
+                # the pruning below keeps such keys
+                self.recent.add(key)
+                continue
+            if when > self.value:
+                self.value = when
+            if when >= self._floor():
+                self.recent.add(key)
+        floor = self._floor()
+        self.recent = {k for k in self.recent if (parse_ts(k[1]) or floor) >= floor}
+        return fresh
+
+    def _floor(self):
+        return self.value.replace(second=0, microsecond=0)
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"watermark": self.value.strftime(API_TS_FORMAT),
+                       "recent": sorted(self.recent, key=str)}, f)
+        os.replace(tmp, self.path)
+
+
+def poll(sess, server, token, selected, watermark, exclude_types=(), metrics=None, cancel=None):
+    """New detections since the watermark (not yet accepted)."""
+    # +1 minute: the query's minute resolution must cover detections from right now
+    end = (datetime.now(timezone.utc) + timedelta(minutes=1)).strftime(QUERY_FORMAT)
+    query = build_query(selected, ["last_timestamp"], watermark.query_start(), end, exclude_types)
+    records = []
+    for page in iter_pages(sess, build_url(server, query), token, metrics, cancel):
+        records.extend(page)
+    return records
+
+
+def watch(server, token, writer, watermark, selected, exclude_types=(), interval=None,
+          cancel=None, on_poll=None):
+    """Poll until cancel is set; on_poll(new count, next delay, error or None) after each poll."""
+    interval = interval or AdaptiveInterval()
+    cancel = cancel or threading.Event()
+    with open_session(1) as sess:
+        while not cancel.is_set():
+            error = None
+            try:
+                fresh = watermark.accept(poll(sess, server, token, selected, watermark,
+                                              exclude_types, cancel=cancel))
+                writer.write(fresh)
+                watermark.save()
+                delay = interval.next(len(fresh))
+            except Cancelled:
+                break
+            except (OSError, ValueError) as e:
+                # Network/API hiccups shouldn't end a long-running tail
+                fresh, error = [], e
+                delay = interval.backoff()
+            if on_poll:
+                on_poll(len(fresh), delay, error)
+            if cancel.wait(delay):
+                break
+    writer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Continuously append new Vectra detections as JSON Lines")
+    parser.add_argument("--server", required=True, help="Vectra Brain FQDN")
+    parser.add_argument("--token", default=os.environ.get("VECTRA_TOKEN"),
+                        help="API token (default: $VECTRA_TOKEN)")
+    parser.add_argument("--category", action="append", dest="categories",
+                        help="Detection category to include (repeatable; default: GUI defaults)")
+    parser.add_argument("--exclude-type", action="append", dest="exclude_types", default=[],
+                        help="detection_type to exclude (repeatable)")
+    parser.add_argument("--out-dir", default=os.path.join(os.path.expanduser("~"), "Downloads", "vectra-tail"),
+                        help="Directory for the .jsonl files and the state file")
+    parser.add_argument("--prefix", default="detections_tail", help="Output file name prefix")
+    parser.add_argument("--since-minutes", type=int, default=60,
+                        help="Look-back for the first poll when there is no saved state")
+    parser.add_argument("--min-interval", type=float, default=DEFAULT_MIN_INTERVAL, help="Seconds")
+    parser.add_argument("--max-interval", type=float, default=DEFAULT_MAX_INTERVAL, help="Seconds")
+    parser.add_argument("--rotate-mb", type=float, help="Start a new file after this many MB")
+    parser.add_argument("--rotate-hours", type=float, help="Start a new file after this many hours")
+    args = parser.parse_args(argv)
+
+    if not args.token:
+        parser.error("--token or $VECTRA_TOKEN is required")
+    selected = args.categories or [val for _, val, dflt in categories if dflt]
+    out_dir = os.path.expanduser(args.out_dir)
+    writer = RotatingJsonl(out_dir, args.prefix,
+                           int(args.rotate_mb * 1024 * 1024) if args.rotate_mb else None,
+                           args.rotate_hours * 3600 if args.rotate_hours else None)
+    watermark = Watermark(os.path.join(out_dir, f"{args.prefix}.state.json"), args.since_minutes)
+    cancel = threading.Event()
+
+    def report(count, delay, error):
+        when = datetime.now().strftime("%H:%M:%S")
+        if error:
+            print(f"[{when}] poll failed: {error}; retrying in {delay:.0f}s")
+        else:
+            print(f"[{when}] {count} new -> {writer.path or '-'}; "
+                  f"watermark {watermark.value:%Y-%m-%d %H:%M:%S}Z; next poll in {delay:.0f}s")
+
+    print(f"Watching {args.server} from {watermark.value:%Y-%m-%d %H:%M}Z (Ctrl+C to stop)")
+    try:
+        watch(args.server, args.token, writer, watermark, selected, args.exclude_types,
+              AdaptiveInterval(args.min_interval, args.max_interval), cancel, report)
+    except KeyboardInterrupt:
+        cancel.set()
+        writer.close()
+        print("Stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import json
+
+from core.diff import CHANGED, diff_exports
+
+
+def _export(path, records):
+    path.write_text(json.dumps({"results": records}))
+    return str(path)
+
+
+def test_dict_valued_field(tmp_path):
+    old = _export(tmp_path / "old.json", [
+        {"id": 1, "src_host": {"name": "a", "threat": 10}},
+        {"id": 2, "src_host": {"threat": 5, "name": "b"}},
+    ])
+    new = _export(tmp_path / "new.json", [
+        {"id": 1, "src_host": {"name": "a", "threat": 80}},
+        {"id": 2, "src_host": {"name": "b", "threat": 5}},  # Same object, other key order
+    ])
+    result = diff_exports(old, new, ["src_host"])
+    assert list(result.changed) == [1]
+    rows = result.rows()
+    assert [(r[0], r[1], r[2]) for r in rows] == [(CHANGED, 1, "src_host")]
+    assert json.loads(rows[0][4]) == {"name": "a", "threat": 80}
@@ -0,0 +1,17 @@
+from core.idload import MAX_ID, load_ids, parse_id
+
+
+def test_parse_id_rejects_values_past_int64():
+    assert parse_id(str(MAX_ID)) == MAX_ID
+    assert parse_id(str(MAX_ID + 1)) is None
+    assert parse_id("12345678901234567890") is None
+
+
+def test_oversized_id_is_reported_not_fatal(tmp_path):
+    path = tmp_path / "ids.csv"
+    path.write_text("detection_id\n5\n12345678901234567890\n3\n5\n")
+    result = load_ids([str(path)])
+    assert list(result.ids) == [3, 5]
+    assert result.invalid == 1
+    assert result.samples[0][2] == "12345678901234567890"
+    assert result.duplicates == 1
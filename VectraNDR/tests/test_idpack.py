@@ -0,0 +1,45 @@
+import re
+import urllib.parse
+
+from core.idpack import pack_ids
+
+
+def _covered(queries):
+    """Numeric IDs matched by the packed queries."""
+    ids = set()
+    for q in queries:
+        for lo, hi in re.findall(r"\[(\d+) TO (\d+)\]", q):
+            ids.update(range(int(lo), int(hi) + 1))
+        for group in re.findall(r"\(([^)]*)\)", q):
+            ids.update(int(v) for v in group.split(" OR ") if v.isdigit())
+    return ids
+
+
+def test_long_runs_become_ranges():
+    ids = [str(n) for n in range(100, 200)] + ["7", "3"]
+    assert pack_ids(ids, 6000) == ["detection.id:[100 TO 199] OR detection.id:(3 OR 7)"]
+
+
+def test_short_runs_stay_single():
+    # A range costs more than a pair (or triple) of grouped IDs once URL-encoded
+    assert pack_ids(["1000000", "1000001"], 6000) == ["detection.id:(1000000 OR 1000001)"]
+    pairs = [str(n) for k in range(3000) for n in (1000000 + 3 * k, 1000001 + 3 * k)]
+    queries = pack_ids(pairs, 6000)
+    assert "TO" not in "".join(queries)
+    assert len(queries) == 16
+
+
+def test_budget_split_covers_every_id():
+    ids = list(range(1, 40000, 2)) + list(range(50000, 50100))
+    queries = pack_ids(ids, 1000)
+    assert len(queries) > 1
+    assert all(len(urllib.parse.quote(q)) <= 1000 for q in queries)
+    assert _covered(queries) == set(ids)
+
+
+def test_oversized_id_gets_its_own_query():
+    huge = "x" * 500
+    queries = pack_ids(["1", huge, "2"], 300)
+    assert len(queries) == 2
+    assert queries[1] == f'detection.id:("{huge}")'
+    assert _covered(queries[:1]) == {1, 2}
@@ -0,0 +1,55 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from core.pipeline import TIMEOUT, Cancelled, PipelineError, request_with_retry, run_pipeline
+
+
+def _pages(fail_on=None):
+    for n in range(1, 5):
+        if n == fail_on:
+            raise OSError("HTTP 500")
+        yield [{"id": n * 10 + i} for i in range(3)]
+
+
+def test_failed_fetch_leaves_no_export(tmp_path):
+    path = str(tmp_path / "detections.json")
+    with pytest.raises(PipelineError):
+        run_pipeline("", "", "", path, pages=_pages(fail_on=3))
+    assert os.listdir(tmp_path) == []
+
+
+def test_complete_export(tmp_path):
+    path = str(tmp_path / "detections.json")
+    assert run_pipeline("", "", "", path, pages=_pages()) == 12
+    with open(path) as f:
+        assert len(json.load(f)["results"]) == 12
+    assert os.listdir(tmp_path) == ["detections.json"]
+
+
+class _SlowSession:
+    """Stands in for a requests.Session whose server never answers in time."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.kwargs = None
+
+    def request(self, method, url, headers=None, **kwargs):
+        self.kwargs = kwargs
+        time.sleep(self.delay)
+        raise AssertionError("abandoned request should not be used")
+
+
+def test_cancel_ends_a_request_still_in_flight():
+    pytest.importorskip("requests")
+    cancel = threading.Event()
+    threading.Timer(0.3, cancel.set).start()
+    sess = _SlowSession(2.0)
+    t0 = time.perf_counter()
+    with pytest.raises(Cancelled):
+        request_with_retry(sess, "GET", "https://brain.example/", {}, cancel=cancel)
+    assert time.perf_counter() - t0 < 1.0
+    assert sess.kwargs["timeout"] == TIMEOUT
@@ -0,0 +1,20 @@
+from datetime import datetime, timezone
+
+from core.watch import Watermark
+
+
+def test_unparseable_timestamp_is_written_once(tmp_path):
+    state = str(tmp_path / "tail.state.json")
+    mark = Watermark(state)
+    odd = {"id": 7, "last_timestamp": "2024/01/01 10:00"}
+    good = {"id": 8, "last_timestamp": "2030-01-01T10:00:30Z"}
+
+    assert mark.accept([odd, good]) == [odd, good]
+    assert mark.value == datetime(2030, 1, 1, 10, 0, 30, tzinfo=timezone.utc)
+    assert mark.accept([odd, good]) == []
+
+    # Still skipped after a restart from the saved state
+    mark.save()
+    again = Watermark(state)
+    assert again.accept([odd]) == []
+    assert again.value == mark.value